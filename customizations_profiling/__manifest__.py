@@ -0,0 +1,28 @@
+{
+    'name': 'Customizations Profiling',
+    'version': '18.0.1.0.0',
+    'category': 'Technical',
+    'summary': 'Strumentazione prestazioni delle customizzazioni',
+    'description': """
+        Strumentazione opzionale degli override delle customizzazioni:
+        - Tempo, numero di query SQL e dimensione recordset per chiamata di
+          SaleOrder.write, SaleOrder.action_confirm,
+          SaleOrderLine._prepare_invoice_line e HelpdeskTicket.write
+        - Attivazione tramite parametro di sistema customizations_profiling.enabled
+        - Aggregazione in memoria (istogramma dei tempi) salvata periodicamente
+        - Report di backend in Impostazioni > Tecnico
+        - Benchmark offline su dati sintetici (solo database locale)
+    """,
+    'author': 'Mistral',
+    'website': '',
+    'depends': ['sale_subscription_customizations', 'helpdesk_customizations'],
+    'data': [
+        'security/ir.model.access.csv',
+        'views/customizations_profiling_stat_views.xml',
+        'data/ir_cron_data.xml',
+    ],
+    'installable': True,
+    'application': False,
+    'auto_install': False,
+    'license': 'LGPL-3',
+}
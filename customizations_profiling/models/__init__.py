@@ -0,0 +1,5 @@
+from . import customizations_profiling_stat
+from . import sale_order
+from . import sale_order_line
+from . import helpdesk_ticket
+from . import customizations_profiling_benchmark
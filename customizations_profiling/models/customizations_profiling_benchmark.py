@@ -0,0 +1,281 @@
+import json
+import logging
+import time
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+from odoo.tools import config
+
+_logger = logging.getLogger(__name__)
+
+LOCAL_DB_HOSTS = ('', 'localhost', '127.0.0.1', '::1')
+
+
+class CustomizationsProfilingBenchmark(models.AbstractModel):
+    """
+    Benchmark offline dei percorsi critici delle customizzazioni, su dati
+    sintetici. Da eseguire solo su un database PostgreSQL locale, dai test
+    (vedi tests/test_benchmark.py, tag benchmark) oppure da shell:
+
+        odoo-bin shell -d <db>
+        >>> env['customizations.profiling.benchmark']._run_benchmark(
+        ...     subscriptions=1000, tickets=5000,
+        ...     output_path='/tmp/benchmark.json',
+        ...     baseline_path='/tmp/benchmark_prev.json')
+
+    Tutti i dati generati vengono annullati (rollback) al termine.
+    """
+    _name = 'customizations.profiling.benchmark'
+    _description = 'Benchmark Customizzazioni'
+
+    @api.model
+    def _check_local_database(self):
+        db_host = config.get('db_host') or ''
+        if db_host not in LOCAL_DB_HOSTS and not db_host.startswith('/'):
+            raise UserError(_(
+                "Il benchmark può essere eseguito solo su un database locale "
+                "(db_host attuale: %s).", db_host
+            ))
+
+    @api.model
+    def _generate_subscriptions(self, count, lines_per_order=1):
+        """
+        Genera count abbonamenti in bozza con lines_per_order righe ciascuno:
+        durate e unità miste, metà con data consegna impegnata (con scadenze
+        distribuite nei prossimi 90 giorni) e metà senza.
+        """
+        today = fields.Date.today()
+        partner = self.env['res.partner'].create({'name': 'Benchmark Cliente'})
+        product = self.env['product.product'].create({
+            'name': 'Benchmark Noleggio',
+            'type': 'service',
+            'recurring_invoice': True,
+            'list_price': 100.0,
+        })
+        plan = self.env['sale.subscription.plan'].create({
+            'name': 'Benchmark Mensile',
+            'billing_period_value': 1,
+            'billing_period_unit': 'month',
+        })
+        durations = [(0, 'months'), (6, 'months'), (12, 'months'), (1, 'years'), (2, 'years')]
+
+        vals_list = []
+        for index in range(count):
+            duration, unit = durations[index % len(durations)]
+            vals = {
+                'partner_id': partner.id,
+                'plan_id': plan.id,
+                'subscription_duration': duration,
+                'subscription_duration_unit': unit,
+                'codice_noleggio': f'BENCH-{index:06d}',
+                'order_line': [fields.Command.create({
+                    'product_id': product.id,
+                    'product_uom_qty': 1,
+                    'price_unit': 100.0,
+                }) for _line in range(lines_per_order)],
+            }
+            if index % 2:
+                delta = relativedelta(**{unit: duration}) if duration else relativedelta()
+                start_date = today - delta + relativedelta(days=index % 90 + 1)
+                # start_date esplicita come nei test: le write successive non
+                # devono dipendere dalla data calcolata alla conferma
+                vals['start_date'] = start_date
+                vals['commitment_date'] = fields.Datetime.to_datetime(start_date)
+            vals_list.append(vals)
+        return self.env['sale.order'].create(vals_list)
+
+    @api.model
+    def _generate_tickets(self, count):
+        """
+        Genera count ticket distribuiti tra una fase normale e una fase
+        in sola lettura.
+        """
+        team = self.env['helpdesk.team'].create({'name': 'Benchmark'})
+        stages = self.env['helpdesk.stage'].create([
+            {'name': 'Benchmark Aperto', 'sequence': 1, 'team_ids': [fields.Command.link(team.id)]},
+            {'name': 'Benchmark Risolto', 'sequence': 10, 'is_readonly_stage': True,
+             'team_ids': [fields.Command.link(team.id)]},
+            {'name': 'Benchmark Da Fatturare', 'sequence': 20, 'is_readonly_stage': True,
+             'team_ids': [fields.Command.link(team.id)]},
+        ])
+        tickets = self.env['helpdesk.ticket'].create([{
+            'name': f'Benchmark {index}',
+            'team_id': team.id,
+            'stage_id': stages[index % 2].id,
+        } for index in range(count)])
+        return tickets, stages
+
+    @api.model
+    def _measure_step(self, results, name, records, func, **extra):
+        self.env.flush_all()
+        start_queries = self.env.cr.sql_log_count
+        start_time = time.perf_counter()
+        func()
+        self.env.flush_all()
+        results[name] = {
+            'time': round(time.perf_counter() - start_time, 4),
+            'queries': self.env.cr.sql_log_count - start_queries,
+            'records': len(records),
+            **extra,
+        }
+        _logger.info("Benchmark %s: %s", name, results[name])
+
+    @api.model
+    def _run_steps(self, subscriptions, tickets, lines_per_order=1):
+        results = {}
+        orders = self._generate_subscriptions(subscriptions, lines_per_order)
+        # La conferma è misurata separatamente per gli abbonamenti senza data
+        # consegna impegnata, che passano dall'impostazione e dal reset in
+        # blocco delle date temporanee
+        orders_with_commitment = orders.filtered('commitment_date')
+        orders_without_commitment = orders - orders_with_commitment
+        self._measure_step(
+            results, 'sale_order_action_confirm', orders_with_commitment,
+            orders_with_commitment.action_confirm,
+        )
+        self._measure_step(
+            results, 'sale_order_action_confirm_without_commitment', orders_without_commitment,
+            orders_without_commitment.action_confirm,
+        )
+        # Alert di scadenza prima della modifica delle durate: le scadenze
+        # generate cadono nei prossimi 90 giorni e sono quindi tutte dovute
+        SaleOrder = self.env['sale.order']
+        orders_due = SaleOrder.browse([order_id for order_id, _stage_id in SaleOrder._get_expiration_alerts_due()])
+        self._measure_step(
+            results, 'sale_order_cron_expiration_alerts', orders_due,
+            SaleOrder._cron_create_expiration_alerts,
+        )
+        self._measure_step(
+            results, 'sale_order_write_duration', orders,
+            lambda: orders.write({'subscription_duration': 3, 'subscription_duration_unit': 'months'}),
+        )
+        # Il numero di query deve crescere con gli ordini, non con le righe:
+        # confrontare esecuzioni con lines_per_order diversi
+        orders_to_invoice = orders.filtered('next_invoice_date')
+        if not orders_to_invoice:
+            raise UserError(_("Benchmark non valido: nessun abbonamento generato da fatturare."))
+        invoices = self.env['account.move']
+
+        def create_invoices():
+            nonlocal invoices
+            invoices = orders_to_invoice._create_invoices()
+
+        self._measure_step(
+            results, 'sale_order_create_invoices', orders_to_invoice,
+            create_invoices,
+            lines=len(orders_to_invoice.order_line),
+        )
+        if not invoices:
+            raise UserError(_("Benchmark non valido: la fatturazione non ha generato fatture."))
+        # Stampa massiva: rendering HTML del report fattura (la conversione in
+        # PDF di wkhtmltopdf non dipende dalle customizzazioni)
+        invoices.invalidate_model()
+        self._measure_step(
+            results, 'account_move_report_invoice', invoices,
+            lambda: self.env['ir.actions.report']._render_qweb_html('account.report_invoice', invoices.ids),
+            lines=len(invoices.invoice_line_ids),
+        )
+
+        ticket_records, stages = self._generate_tickets(tickets)
+        open_tickets = ticket_records.filtered(lambda t: t.stage_id == stages[0])
+        self._measure_step(
+            results, 'helpdesk_ticket_stage_move', open_tickets,
+            lambda: open_tickets.write({'stage_id': stages[1].id}),
+        )
+        # Controllo dello spostamento a una fase precedente per tutti i ticket
+        # chiusi: una passata sul recordset e un solo controllo dei permessi
+        readonly_tickets = ticket_records.filtered(lambda t: t.stage_id.is_readonly_stage)
+        self._measure_step(
+            results, 'helpdesk_ticket_stage_check', readonly_tickets,
+            lambda: readonly_tickets._check_stage_change_allowed(stages[0].id),
+        )
+        closed_tickets = ticket_records.filtered(lambda t: t.stage_id == stages[1])
+        self._measure_step(
+            results, 'helpdesk_ticket_stage_move_closed', closed_tickets,
+            lambda: closed_tickets.write({'stage_id': stages[2].id}),
+        )
+        self._measure_step(
+            results, 'helpdesk_ticket_reopen', ticket_records,
+            ticket_records.action_reopen_ticket,
+        )
+        # Riassegnazione massiva: un solo riepilogo di assegnazione
+        assignee = self.env['res.users'].create({
+            'name': 'Benchmark Assegnatario',
+            'login': 'customizations_benchmark_assignee',
+            'email': 'benchmark.assignee@example.com',
+            'groups_id': [fields.Command.link(self.env.ref('helpdesk.group_helpdesk_user').id)],
+        })
+        self._measure_step(
+            results, 'helpdesk_ticket_assign', ticket_records,
+            lambda: ticket_records.write({'user_id': assignee.id}),
+        )
+        return results
+
+    @api.model
+    def _get_regressions(self, results, baseline, threshold):
+        regressions = []
+        for name, result in results.items():
+            previous = baseline.get(name)
+            if not previous:
+                continue
+            for measure in ('time', 'queries'):
+                if previous[measure] and result[measure] > previous[measure] * (1 + threshold):
+                    regressions.append(
+                        f"{name}: {measure} {previous[measure]} -> {result[measure]}"
+                    )
+        return regressions
+
+    @api.model
+    def _run_benchmark(self, subscriptions=200, tickets=1000, output_path=None,
+                       baseline_path=None, threshold=None, lines_per_order=1):
+        """
+        Esegue il benchmark e restituisce i risultati (tempo in secondi,
+        numero di query e di record per percorso). Ogni abbonamento generato
+        ha lines_per_order righe. Se output_path è indicato
+        i risultati vengono salvati in JSON. Se baseline_path è indicato i
+        risultati vengono confrontati con un'esecuzione precedente e viene
+        sollevato un errore se tempo o query peggiorano oltre la soglia
+        (parametro di sistema customizations_profiling.benchmark_threshold,
+        default 0.2 = 20%).
+        """
+        self._check_local_database()
+        if threshold is None:
+            threshold = float(self.env['ir.config_parameter'].sudo().get_param(
+                'customizations_profiling.benchmark_threshold', 0.2
+            ))
+
+        cr = self.env.cr
+        self.env.flush_all()
+        cr.execute('SAVEPOINT customizations_benchmark')
+        try:
+            results = self._run_steps(subscriptions, tickets, lines_per_order)
+        finally:
+            self.env.flush_all()
+            cr.execute('ROLLBACK TO SAVEPOINT customizations_benchmark')
+            self.env.invalidate_all(flush=False)
+
+        report = {
+            'date': fields.Datetime.to_string(fields.Datetime.now()),
+            'database': cr.dbname,
+            'subscriptions': subscriptions,
+            'tickets': tickets,
+            'lines_per_order': lines_per_order,
+            'results': results,
+        }
+        if output_path:
+            with open(output_path, 'w') as output_file:
+                json.dump(report, output_file, indent=2)
+
+        if baseline_path:
+            with open(baseline_path) as baseline_file:
+                baseline = json.load(baseline_file).get('results', {})
+            regressions = self._get_regressions(results, baseline, threshold)
+            if regressions:
+                raise UserError(_(
+                    "Regressioni di prestazioni oltre la soglia del %(threshold)s%%:\n%(regressions)s",
+                    threshold=round(threshold * 100),
+                    regressions="\n".join(regressions),
+                ))
+        return report
@@ -0,0 +1,148 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import api, fields, models, SUPERUSER_ID
+
+_logger = logging.getLogger(__name__)
+
+# Limiti superiori (ms) delle fasce dell'istogramma dei tempi
+TIME_BUCKETS = (10, 50, 100, 500, 1000)
+
+# Statistiche in memoria del processo, per database: {dbname: {metodo: valori}}
+_stats_lock = threading.Lock()
+_stats_buffer = defaultdict(dict)
+_last_flush = {}
+
+# Metodi in corso di misura nel thread, per non contare le chiamate annidate
+_local = threading.local()
+
+
+def _bucket_field(elapsed_ms):
+    for limit in TIME_BUCKETS:
+        if elapsed_ms < limit:
+            return f'bucket_{limit}'
+    return 'bucket_over'
+
+
+class CustomizationsProfilingStat(models.Model):
+    _name = 'customizations.profiling.stat'
+    _description = 'Statistiche Prestazioni Customizzazioni'
+    _order = 'date desc, name'
+
+    name = fields.Char(string='Metodo', required=True, index=True)
+    date = fields.Datetime(string='Data', required=True, index=True, default=fields.Datetime.now)
+    call_count = fields.Integer(string='Chiamate')
+    total_time = fields.Float(string='Tempo Totale (ms)')
+    max_time = fields.Float(string='Tempo Massimo (ms)', aggregator='max')
+    avg_time = fields.Float(string='Tempo Medio (ms)', compute='_compute_averages')
+    total_queries = fields.Integer(string='Query Totali')
+    max_queries = fields.Integer(string='Query Massime', aggregator='max')
+    avg_queries = fields.Float(string='Query Medie', compute='_compute_averages')
+    total_records = fields.Integer(string='Record Totali')
+    max_records = fields.Integer(string='Record Massimi', aggregator='max')
+    bucket_10 = fields.Integer(string='< 10 ms')
+    bucket_50 = fields.Integer(string='10-50 ms')
+    bucket_100 = fields.Integer(string='50-100 ms')
+    bucket_500 = fields.Integer(string='100-500 ms')
+    bucket_1000 = fields.Integer(string='500-1000 ms')
+    bucket_over = fields.Integer(string='>= 1000 ms')
+
+    @api.depends('call_count', 'total_time', 'total_queries')
+    def _compute_averages(self):
+        for stat in self:
+            stat.avg_time = stat.total_time / stat.call_count if stat.call_count else 0.0
+            stat.avg_queries = stat.total_queries / stat.call_count if stat.call_count else 0.0
+
+    @api.model
+    def _is_enabled(self):
+        return bool(self.env['ir.config_parameter'].sudo().get_param('customizations_profiling.enabled'))
+
+    @api.model
+    def _profile(self, name, records):
+        """
+        Context manager che misura la chiamata indicata (tempo, query SQL,
+        dimensione del recordset) se la strumentazione è attiva.
+        Le chiamate annidate dello stesso metodo non vengono contate due volte.
+        """
+        active = getattr(_local, 'active', None)
+        if active is None:
+            active = _local.active = set()
+        if name in active or not self._is_enabled():
+            return nullcontext()
+        return self._measure(name, len(records), active)
+
+    @contextmanager
+    def _measure(self, name, record_count, active):
+        cr = self.env.cr
+        active.add(name)
+        start_queries = cr.sql_log_count
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start_time) * 1000
+            queries = cr.sql_log_count - start_queries
+            active.discard(name)
+            self._record(name, elapsed_ms, queries, record_count)
+
+    @api.model
+    def _record(self, name, elapsed_ms, queries, record_count):
+        dbname = self.env.cr.dbname
+        with _stats_lock:
+            stat = _stats_buffer[dbname].setdefault(name, defaultdict(float))
+            stat['call_count'] += 1
+            stat['total_time'] += elapsed_ms
+            stat['max_time'] = max(stat['max_time'], elapsed_ms)
+            stat['total_queries'] += queries
+            stat['max_queries'] = max(stat['max_queries'], queries)
+            stat['total_records'] += record_count
+            stat['max_records'] = max(stat['max_records'], record_count)
+            stat[_bucket_field(elapsed_ms)] += 1
+            last_flush = _last_flush.setdefault(dbname, time.monotonic())
+
+        flush_interval = int(self.env['ir.config_parameter'].sudo().get_param(
+            'customizations_profiling.flush_interval', 300
+        ))
+        if time.monotonic() - last_flush >= flush_interval:
+            self._flush_stats()
+
+    @api.model
+    def _flush_stats(self):
+        """
+        Salva le statistiche in memoria di questo processo con un cursore
+        separato, indipendente dalla transazione in corso.
+        Ogni salvataggio crea nuove righe (una per metodo): i processi non
+        aggiornano mai le stesse righe e non entrano in conflitto.
+        """
+        dbname = self.env.cr.dbname
+        with _stats_lock:
+            stats = _stats_buffer.pop(dbname, {})
+            _last_flush[dbname] = time.monotonic()
+        if not stats:
+            return
+
+        vals_list = [{'name': name, **stat} for name, stat in stats.items()]
+        try:
+            with self.env.registry.cursor() as cr:
+                env = api.Environment(cr, SUPERUSER_ID, {})
+                env['customizations.profiling.stat'].create(vals_list)
+        except Exception:
+            _logger.warning("Salvataggio statistiche di profiling non riuscito", exc_info=True)
+
+    @api.model
+    def _cron_flush_stats(self):
+        """
+        Cron job che salva le statistiche in memoria del processo cron ed
+        elimina quelle più vecchie del periodo di conservazione.
+        """
+        self._flush_stats()
+        retention_days = int(self.env['ir.config_parameter'].sudo().get_param(
+            'customizations_profiling.retention_days', 30
+        ))
+        limit_date = fields.Datetime.now() - relativedelta(days=retention_days)
+        self.search([('date', '<', limit_date)]).unlink()
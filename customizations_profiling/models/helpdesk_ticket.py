@@ -0,0 +1,9 @@
+from odoo import models
+
+
+class HelpdeskTicket(models.Model):
+    _inherit = 'helpdesk.ticket'
+
+    def write(self, vals):
+        with self.env['customizations.profiling.stat']._profile('helpdesk.ticket.write', self):
+            return super().write(vals)
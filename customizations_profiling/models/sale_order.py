@@ -0,0 +1,13 @@
+from odoo import models
+
+
+class SaleOrder(models.Model):
+    _inherit = 'sale.order'
+
+    def write(self, vals):
+        with self.env['customizations.profiling.stat']._profile('sale.order.write', self):
+            return super().write(vals)
+
+    def action_confirm(self):
+        with self.env['customizations.profiling.stat']._profile('sale.order.action_confirm', self):
+            return super().action_confirm()
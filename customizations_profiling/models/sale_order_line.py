@@ -0,0 +1,9 @@
+from odoo import models
+
+
+class SaleOrderLine(models.Model):
+    _inherit = 'sale.order.line'
+
+    def _prepare_invoice_line(self, **optional_values):
+        with self.env['customizations.profiling.stat']._profile('sale.order.line._prepare_invoice_line', self):
+            return super()._prepare_invoice_line(**optional_values)
@@ -0,0 +1,37 @@
+import os
+
+from odoo.exceptions import UserError
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('-standard', '-at_install', 'post_install', 'benchmark')
+class TestCustomizationsBenchmark(TransactionCase):
+    """
+    Esegue il benchmark offline delle customizzazioni. Escluso dai test
+    standard, va lanciato esplicitamente su un database locale:
+
+        odoo-bin -d <db> -i customizations_profiling --test-tags benchmark --stop-after-init
+
+    Parametri tramite variabili d'ambiente:
+    - CUSTOMIZATIONS_BENCHMARK_SUBSCRIPTIONS (default 200)
+    - CUSTOMIZATIONS_BENCHMARK_TICKETS (default 1000)
+    - CUSTOMIZATIONS_BENCHMARK_LINES_PER_ORDER (default 1)
+    - CUSTOMIZATIONS_BENCHMARK_OUTPUT: file JSON dei risultati
+    - CUSTOMIZATIONS_BENCHMARK_BASELINE: file JSON di un'esecuzione precedente
+    - CUSTOMIZATIONS_BENCHMARK_THRESHOLD: soglia di regressione (0.2 = 20%)
+    """
+
+    def test_benchmark(self):
+        threshold = os.environ.get('CUSTOMIZATIONS_BENCHMARK_THRESHOLD')
+        try:
+            report = self.env['customizations.profiling.benchmark']._run_benchmark(
+                subscriptions=int(os.environ.get('CUSTOMIZATIONS_BENCHMARK_SUBSCRIPTIONS', 200)),
+                tickets=int(os.environ.get('CUSTOMIZATIONS_BENCHMARK_TICKETS', 1000)),
+                lines_per_order=int(os.environ.get('CUSTOMIZATIONS_BENCHMARK_LINES_PER_ORDER', 1)),
+                output_path=os.environ.get('CUSTOMIZATIONS_BENCHMARK_OUTPUT'),
+                baseline_path=os.environ.get('CUSTOMIZATIONS_BENCHMARK_BASELINE'),
+                threshold=float(threshold) if threshold else None,
+            )
+        except UserError as e:
+            self.fail(str(e))
+        self.assertTrue(report['results']['sale_order_cron_expiration_alerts']['records'])
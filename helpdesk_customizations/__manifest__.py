@@ -1,6 +1,6 @@
 {
     'name': 'Helpdesk Customizations',
-    'version': '18.0.1.3.0',
+    'version': '18.0.1.4.0',
     'category': 'Services/Helpdesk',
     'summary': 'Customizzazioni modulo Helpdesk',
     'description': """
@@ -12,16 +12,22 @@
         - Campo "Ticket Sola Lettura" sugli stage
         - Blocco tab Fogli Ore su ticket in fase readonly
         - Email assegnazione ticket: aggiunto nome cliente
+        - Riepilogo unico di assegnazione per la riassegnazione massiva dei ticket
+        - Storico cambi fase/riaperture e analisi tempi di risoluzione
     """,
     'author': 'Mistral Digital Solutions s.r.l',
     'website': '',
     'depends': ['helpdesk', 'helpdesk_timesheet', 'mail'],
     'data': [
         'security/helpdesk_security.xml',
+        'security/ir.model.access.csv',
+        'data/ir_cron_data.xml',
+        'data/ir_actions_server_data.xml',
         'views/helpdesk_stage_views.xml',
         'views/helpdesk_ticket_views.xml',
         'views/helpdesk_ticket_timesheet_views.xml',
         'views/mail_templates.xml',
+        'report/helpdesk_ticket_resolution_report_views.xml',
     ],
     'assets': {
         'web.assets_backend': [
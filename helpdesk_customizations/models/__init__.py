@@ -1,2 +1,3 @@
 from . import helpdesk_stage
 from . import helpdesk_ticket
+from . import helpdesk_ticket_stage_log
@@ -1,4 +1,5 @@
-from odoo import fields, models
+from odoo import api, fields, models
+from odoo.tools import SQL
 
 
 class HelpdeskStage(models.Model):
@@ -10,3 +11,118 @@ class HelpdeskStage(models.Model):
         help='Se abilitato, i ticket in questa fase saranno in sola lettura '
              '(non modificabili). Usare per fasi come Risolto, Da fatturare, etc.'
     )
+
+    # Campo per le fasi con molti ticket il cui is_closed_stage
+    # viene allineato a blocchi dal cron
+    closed_stage_sync_pending = fields.Boolean(
+        string='Allineamento Ticket in Corso',
+        default=False,
+        copy=False,
+        help='True se il flag "chiuso" dei ticket di questa fase deve ancora '
+             'essere allineato dopo la modifica di "Ticket Sola Lettura".'
+    )
+
+    def write(self, vals):
+        """
+        Override write per allineare is_closed_stage dei ticket quando cambia
+        is_readonly_stage. Il ricalcolo non passa dall'ORM (che riscriverebbe
+        il campo ticket per ticket) ma da un UPDATE per fase.
+        """
+        if 'is_readonly_stage' not in vals:
+            return super().write(vals)
+
+        changed_stages = self.filtered(
+            lambda s: s.is_readonly_stage != bool(vals['is_readonly_stage'])
+        )
+        res = super().write(vals)
+        if changed_stages:
+            changed_stages._sync_tickets_closed_stage()
+        return res
+
+    @api.model
+    def _get_closed_stage_sync_batch_size(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'helpdesk_customizations.closed_stage_sync_batch_size', 10000
+        ))
+
+    def _update_tickets_closed_stage(self, limit=None):
+        """
+        Allinea is_closed_stage dei ticket della fase con un solo UPDATE,
+        rispettando is_reopened (un ticket riaperto non è mai chiuso).
+        Se limit è indicato aggiorna al massimo limit ticket.
+
+        :return: numero di ticket aggiornati
+        """
+        self.ensure_one()
+        Ticket = self.env['helpdesk.ticket']
+        self.flush_recordset(['is_readonly_stage'])
+        Ticket.flush_model(['stage_id', 'is_reopened', 'is_closed_stage'])
+        closed_value = SQL(
+            "(%s AND NOT COALESCE(is_reopened, FALSE))", self.is_readonly_stage,
+        )
+        self.env.cr.execute(SQL(
+            """
+            UPDATE %(table)s
+               SET is_closed_stage = %(closed_value)s
+             WHERE id IN (
+                    SELECT id
+                      FROM %(table)s
+                     WHERE stage_id = %(stage_id)s
+                       AND is_closed_stage IS DISTINCT FROM %(closed_value)s
+                     %(limit)s
+                   )
+            """,
+            table=SQL.identifier(Ticket._table),
+            closed_value=closed_value,
+            stage_id=self.id,
+            limit=SQL("LIMIT %s", limit) if limit else SQL(),
+        ))
+        count = self.env.cr.rowcount
+        if count:
+            Ticket.invalidate_model(['is_closed_stage'])
+        return count
+
+    def _sync_tickets_closed_stage(self):
+        """
+        Allinea is_closed_stage dei ticket delle fasi.
+        Le fasi con pochi ticket vengono aggiornate subito; quelle con più
+        ticket della dimensione di blocco vengono marcate e aggiornate a
+        blocchi dal cron, che committa ogni blocco.
+        """
+        batch_size = self._get_closed_stage_sync_batch_size()
+        self.env['helpdesk.ticket'].flush_model(['stage_id'])
+        self.env.cr.execute("""
+            SELECT stage_id, COUNT(*)
+              FROM helpdesk_ticket
+             WHERE stage_id = ANY(%s)
+          GROUP BY stage_id
+        """, (self.ids,))
+        ticket_counts = dict(self.env.cr.fetchall())
+
+        large_stages = self.filtered(lambda s: ticket_counts.get(s.id, 0) > batch_size)
+        for stage in self - large_stages:
+            stage._update_tickets_closed_stage()
+        if large_stages:
+            large_stages.closed_stage_sync_pending = True
+            self.env.ref('helpdesk_customizations.ir_cron_sync_ticket_closed_stage')._trigger()
+
+    @api.model
+    def _cron_sync_tickets_closed_stage(self):
+        """
+        Cron job che allinea a blocchi is_closed_stage dei ticket delle fasi
+        marcate come da allineare. Ogni esecuzione elabora un blocco; il cron
+        si rilancia finché restano fasi da allineare.
+        """
+        stages = self.with_context(active_test=False).search([('closed_stage_sync_pending', '=', True)])
+        if not stages:
+            self.env['ir.cron']._notify_progress(done=0, remaining=0)
+            return
+
+        batch_size = self._get_closed_stage_sync_batch_size()
+        stage = stages[0]
+        count = stage._update_tickets_closed_stage(limit=batch_size)
+        if count < batch_size:
+            stage.closed_stage_sync_pending = False
+            stages -= stage
+
+        self.env['ir.cron']._notify_progress(done=count, remaining=len(stages))
@@ -1,5 +1,7 @@
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
+from odoo.tools import SQL
+from odoo.tools.sql import column_exists, create_column
 
 
 class HelpdeskTicket(models.Model):
@@ -26,14 +28,17 @@ class HelpdeskTicket(models.Model):
 
     # Campo computed per identificare se il ticket è in uno stage "chiuso"
     # Basato sul campo is_readonly_stage dello stage
+    # Le modifiche di stage_id.is_readonly_stage non sono tra le dipendenze:
+    # vengono propagate in blocco da HelpdeskStage.write (un UPDATE per fase)
     is_closed_stage = fields.Boolean(
         string='Is Closed Stage',
         compute='_compute_is_closed_stage',
         store=True,
+        index=True,
         help='True se il ticket è in uno stage con is_readonly_stage=True'
     )
 
-    @api.depends('stage_id', 'stage_id.is_readonly_stage', 'is_reopened')
+    @api.depends('stage_id', 'is_reopened')
     def _compute_is_closed_stage(self):
         for ticket in self:
             if ticket.is_reopened:
@@ -45,12 +50,36 @@ class HelpdeskTicket(models.Model):
             else:
                 ticket.is_closed_stage = False
 
-    # Override display_name per mostrare il numero ticket PRIMA del titolo
-    # Adattato per Odoo 18 che usa una struttura diversa
-    @api.depends('ticket_ref', 'name', 'partner_name')
-    @api.depends_context('with_partner')
-    def _compute_display_name(self):
-        display_partner_name = self._context.get('with_partner', False)
+    # Chiave "riferimento + titolo" memorizzata e indicizzata (trigram):
+    # base del display_name e unica colonna usata dalla ricerca per nome
+    ticket_display_name = fields.Char(
+        string='Numero e Titolo',
+        compute='_compute_ticket_display_name',
+        store=True,
+        index='trigram',
+        help='Numero ticket seguito dal titolo, es. "#TIC-25-20385 - Titolo del ticket"'
+    )
+
+    def _auto_init(self):
+        """
+        Crea e valorizza ticket_display_name via SQL all'installazione,
+        evitando il ricalcolo ORM ticket per ticket su tabelle molto grandi.
+        """
+        if not column_exists(self.env.cr, 'helpdesk_ticket', 'ticket_display_name'):
+            create_column(self.env.cr, 'helpdesk_ticket', 'ticket_display_name', 'varchar')
+            self.env.cr.execute("""
+                UPDATE helpdesk_ticket
+                   SET ticket_display_name = CASE
+                       WHEN COALESCE(ticket_ref, '') != '' THEN
+                           '#' || ticket_ref
+                           || CASE WHEN COALESCE(name, '') != '' THEN ' - ' || name ELSE '' END
+                       ELSE COALESCE(name, '')
+                   END
+            """)
+        return super()._auto_init()
+
+    @api.depends('ticket_ref', 'name')
+    def _compute_ticket_display_name(self):
         for ticket in self:
             if ticket.ticket_ref:
                 # Formato: "#TIC-25-20385 - Titolo del ticket"
@@ -59,12 +88,35 @@ class HelpdeskTicket(models.Model):
                     name += f" - {ticket.name}"
             else:
                 name = ticket.name or ''
+            ticket.ticket_display_name = name
 
+    # Override display_name per mostrare il numero ticket PRIMA del titolo
+    # Adattato per Odoo 18 che usa una struttura diversa
+    @api.depends('ticket_display_name', 'partner_name')
+    @api.depends_context('with_partner')
+    def _compute_display_name(self):
+        display_partner_name = self._context.get('with_partner', False)
+        for ticket in self:
+            name = ticket.ticket_display_name or ''
             if display_partner_name and ticket.partner_name:
                 name += f" - {ticket.partner_name}"
 
             ticket.display_name = name
 
+    @api.model
+    def _search_display_name(self, operator, value):
+        """
+        Override per cercare (autocompletamento many2one, ricerca per nome)
+        sulla sola colonna indicizzata ticket_display_name, compresi i
+        riferimenti "#TIC-...", invece di più colonne in ILIKE.
+        Solo le ricerche per sottostringa (ilike/like) usano la chiave: le
+        ricerche esatte (=, =like, =ilike) restano al metodo standard, così
+        un titolo o un riferimento continuano a corrispondere da soli.
+        """
+        if operator in ('ilike', 'like') and isinstance(value, str):
+            return [('ticket_display_name', operator, value)]
+        return super()._search_display_name(operator, value)
+
     def _user_can_reopen_ticket(self):
         """
         Verifica se l'utente corrente ha i permessi per riaprire/spostare ticket chiusi.
@@ -79,6 +131,18 @@ class HelpdeskTicket(models.Model):
             or self.env.user.has_group('base.group_system')
         )
 
+    def _get_stage_change_blocked_tickets(self, new_stage):
+        """
+        Restituisce i ticket il cui spostamento alla fase indicata è bloccato
+        (senza considerare i permessi dell'utente): ticket in fase readonly,
+        non riaperti, spostati a una fase con sequence inferiore.
+        """
+        return self.filtered(
+            lambda t: t.stage_id.is_readonly_stage
+            and not t.is_reopened
+            and new_stage.sequence < t.stage_id.sequence
+        )
+
     def _check_stage_change_allowed(self, new_stage_id):
         """
         Verifica se lo spostamento a una nuova fase è consentito.
@@ -90,27 +154,36 @@ class HelpdeskTicket(models.Model):
 
         new_stage = self.env['helpdesk.stage'].browse(new_stage_id)
 
-        for ticket in self:
-            # Se il ticket non è in una fase readonly, permetti qualsiasi spostamento
-            if not ticket.stage_id.is_readonly_stage:
-                continue
+        # Un solo passaggio sul recordset per trovare i ticket bloccati
+        blocked_tickets = self._get_stage_change_blocked_tickets(new_stage)
+        if not blocked_tickets:
+            return
 
-            # Se l'utente ha permessi speciali, permetti lo spostamento
-            if ticket._user_can_reopen_ticket():
-                continue
+        # Se l'utente ha permessi speciali, permetti lo spostamento.
+        # Il controllo viene fatto una volta per chiamata (has_group è già
+        # in cache e la cache viene invalidata alla modifica dei gruppi).
+        if self._user_can_reopen_ticket():
+            return
 
-            # Se il ticket è stato riaperto, permetti lo spostamento
-            if ticket.is_reopened:
-                continue
+        raise UserError(_(
+            "Non è possibile spostare il ticket '%(ticket)s' alla fase '%(stage)s' "
+            "perché è già stato risolto. Contatta un amministratore se necessario.",
+            ticket=blocked_tickets[0].display_name,
+            stage=new_stage.name,
+        ))
 
-            # Blocca lo spostamento a fasi con sequence inferiore
-            if new_stage.sequence < ticket.stage_id.sequence:
-                raise UserError(_(
-                    "Non è possibile spostare il ticket '%(ticket)s' alla fase '%(stage)s' "
-                    "perché è già stato risolto. Contatta un amministratore se necessario.",
-                    ticket=ticket.display_name,
-                    stage=new_stage.name,
-                ))
+    def get_allowed_stage_ids(self):
+        """
+        Restituisce gli id delle fasi del team verso cui il ticket può essere
+        spostato, con le stesse regole di _check_stage_change_allowed.
+        Usato dal widget statusbar per validare lo spostamento prima del
+        salvataggio, evitando una write destinata a fallire.
+        """
+        self.ensure_one()
+        stages = self.team_id.stage_ids or self.env['helpdesk.stage'].search([])
+        if self._user_can_reopen_ticket():
+            return stages.ids
+        return stages.filtered(lambda s: not self._get_stage_change_blocked_tickets(s)).ids
 
     def write(self, vals):
         # Verifica se lo spostamento di fase è consentito
@@ -123,37 +196,121 @@ class HelpdeskTicket(models.Model):
 
         # Gestione preservazione close_date
         # Salviamo le close_date esistenti prima della write
+        # e le fasi di partenza per lo storico cambi fase
         preserved_close_dates = {}
+        from_stages = {}
         if vals.get('stage_id'):
             for ticket in self:
+                from_stages[ticket.id] = ticket.stage_id.id
                 if ticket.close_date:
                     preserved_close_dates[ticket.id] = ticket.close_date
 
         # Chiamata al metodo originale
         res = super().write(vals)
 
+        # Storico cambi fase: una sola create per tutti i ticket spostati
+        if from_stages:
+            moved_tickets = self.filtered(lambda t: t.stage_id.id != from_stages[t.id])
+            if moved_tickets:
+                self.env['helpdesk.ticket.stage.log']._log_events(moved_tickets, 'stage', from_stages)
+
         # Ripristino close_date per i ticket che l'avevano già
         # Questo mantiene la data di chiusura originale quando si sposta
         # un ticket già chiuso in un'altra fase post-risoluzione
         if preserved_close_dates:
-            for ticket in self:
-                if ticket.id in preserved_close_dates and not ticket.close_date:
-                    # Ripristina la close_date senza triggerare altri eventi
-                    super(HelpdeskTicket, ticket).write({
-                        'close_date': preserved_close_dates[ticket.id]
-                    })
+            tickets_to_restore = self.filtered(
+                lambda t: t.id in preserved_close_dates and not t.close_date
+            )
+            if tickets_to_restore:
+                tickets_to_restore._restore_close_dates(preserved_close_dates)
 
         return res
 
+    def _restore_close_dates(self, close_dates):
+        """
+        Ripristina le close_date indicate ({id ticket: close_date}) con un solo
+        UPDATE per tutti i ticket, senza passare dalla write (niente tracking
+        né logica mail.thread). I campi calcolati che dipendono da close_date
+        vengono comunque ricalcolati.
+        """
+        self.flush_recordset(['close_date'])
+        self.env.cr.execute(SQL(
+            """
+            UPDATE %(table)s AS ticket
+               SET close_date = restored.close_date
+              FROM (VALUES %(values)s) AS restored(id, close_date)
+             WHERE ticket.id = restored.id
+            """,
+            table=SQL.identifier(self._table),
+            values=SQL(", ").join(
+                SQL("(%s, %s::timestamp)", ticket.id, close_dates[ticket.id])
+                for ticket in self
+            ),
+        ))
+        self.invalidate_recordset(['close_date'])
+        self.modified(['close_date'])
+
     def action_reopen_ticket(self):
         """
-        Riapre un ticket per permettere modifiche senza cambiare lo stage.
+        Riapre i ticket per permettere modifiche senza cambiare lo stage.
         Richiede permessi speciali.
+        Utilizzabile anche in massa dalla vista lista: il permesso viene
+        verificato una volta, il flag scritto con una sola write e la nota
+        di riapertura registrata nel chatter con un'unica creazione di messaggi.
         """
-        for ticket in self:
-            if not ticket._user_can_reopen_ticket():
-                raise UserError(_(
-                    "Non hai i permessi per riaprire questo ticket. "
-                    "Contatta un amministratore."
-                ))
-            ticket.is_reopened = True
+        if not self._user_can_reopen_ticket():
+            raise UserError(_(
+                "Non hai i permessi per riaprire questo ticket. "
+                "Contatta un amministratore."
+            ))
+
+        # Solo i ticket effettivamente chiusi (non già riaperti)
+        tickets = self.filtered(lambda t: t.is_closed_stage)
+        if not tickets:
+            return
+        tickets.is_reopened = True
+
+        body = _("Ticket riaperto da %s.", self.env.user.name)
+        tickets._message_log_batch(bodies={ticket.id: body for ticket in tickets})
+        self.env['helpdesk.ticket.stage.log']._log_events(tickets, 'reopen')
+
+    def _message_auto_subscribe_notify(self, partner_ids, template):
+        """
+        Notifica di assegnazione in blocco: quando più ticket vengono assegnati
+        insieme (es. riassegnazione massiva dalla vista lista) invia un unico
+        riepilogo per azienda invece di una mail per ticket.
+        Riferimenti e clienti vengono letti in un'unica query per tutti i
+        ticket, il template viene renderizzato una volta per gruppo e le mail
+        ai destinatari create con un solo message_notify.
+        Il singolo ticket mantiene la notifica standard.
+        """
+        if (
+            len(self) <= 1
+            or template != 'mail.message_user_assigned'
+            or not partner_ids
+            or self.env.context.get('mail_auto_subscribe_no_notify')
+            or not self.env.registry.ready
+        ):
+            return super()._message_auto_subscribe_notify(partner_ids, template)
+
+        self.fetch(['name', 'ticket_ref', 'partner_id', 'company_id'])
+        self.partner_id.fetch(['name'])
+        model_description = self.env['ir.model']._get(self._name).display_name
+        view = self.env.ref('helpdesk_customizations.message_user_assigned_batch')
+
+        for company, tickets in self.grouped('company_id').items():
+            body = view._render({
+                'tickets': tickets,
+                'access_links': {ticket.id: ticket._notify_get_action_link('view') for ticket in tickets},
+                'company': company.sudo() or self.env.company,
+                'model_description': model_description,
+            }, engine='ir.qweb', minimal_qcontext=True)
+            body = self.env['mail.render.mixin']._replace_local_links(body)
+            self.env['mail.thread'].message_notify(
+                subject=_("You have been assigned to %(count)s %(model)s", count=len(tickets), model=model_description),
+                body=body,
+                partner_ids=partner_ids,
+                email_layout_xmlid='mail.mail_notification_layout',
+                model_description=model_description,
+                mail_auto_delete=False,
+            )
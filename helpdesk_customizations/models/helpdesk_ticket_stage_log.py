@@ -0,0 +1,69 @@
+from odoo import api, fields, models
+from odoo.tools.sql import create_index
+
+
+class HelpdeskTicketStageLog(models.Model):
+    """
+    Storico compatto dei cambi fase e delle riaperture dei ticket, scritto in
+    blocco da HelpdeskTicket.write e action_reopen_ticket. È la base dei
+    report su tempi di risoluzione e riaperture, senza leggere lo storico
+    del chatter (mail.tracking.value).
+    """
+    _name = 'helpdesk.ticket.stage.log'
+    _description = 'Storico Fasi Ticket'
+    _order = 'date desc, id desc'
+    _log_access = False
+
+    ticket_id = fields.Many2one(
+        'helpdesk.ticket',
+        string='Ticket',
+        required=True,
+        ondelete='cascade',
+    )
+    team_id = fields.Many2one('helpdesk.team', string='Team')
+    event_type = fields.Selection(
+        selection=[
+            ('stage', 'Cambio Fase'),
+            ('reopen', 'Riapertura'),
+        ],
+        string='Evento',
+        required=True,
+        default='stage',
+    )
+    from_stage_id = fields.Many2one('helpdesk.stage', string='Da Fase', ondelete='set null')
+    to_stage_id = fields.Many2one('helpdesk.stage', string='A Fase', ondelete='set null')
+    is_readonly_stage = fields.Boolean(
+        string='Fase Sola Lettura',
+        help='True se la fase di destinazione è in sola lettura (ticket risolto).'
+    )
+    date = fields.Datetime(string='Data', required=True, index=True, default=fields.Datetime.now)
+    user_id = fields.Many2one('res.users', string='Utente', default=lambda self: self.env.user)
+
+    def init(self):
+        create_index(
+            self.env.cr,
+            'helpdesk_ticket_stage_log_ticket_event_date_idx',
+            self._table,
+            ['ticket_id', 'event_type', 'date'],
+        )
+
+    @api.model
+    def _log_events(self, tickets, event_type, from_stages=None):
+        """
+        Registra un evento per ciascun ticket con una sola create.
+
+        :param from_stages: {id ticket: id fase di partenza} per i cambi fase
+        """
+        now = fields.Datetime.now()
+        user_id = self.env.user.id
+        from_stages = from_stages or {}
+        self.sudo().create([{
+            'ticket_id': ticket.id,
+            'team_id': ticket.team_id.id,
+            'event_type': event_type,
+            'from_stage_id': from_stages.get(ticket.id, False),
+            'to_stage_id': ticket.stage_id.id,
+            'is_readonly_stage': ticket.stage_id.is_readonly_stage,
+            'date': now,
+            'user_id': user_id,
+        } for ticket in tickets])
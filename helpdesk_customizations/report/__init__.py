@@ -0,0 +1 @@
+from . import helpdesk_ticket_resolution_report
@@ -0,0 +1,58 @@
+from odoo import fields, models, tools
+
+
+class HelpdeskTicketResolutionReport(models.Model):
+    """
+    Analisi tempi di risoluzione e riaperture dei ticket, calcolata dallo
+    storico fasi (helpdesk.ticket.stage.log). Un ticket è considerato risolto
+    la prima volta che entra in una fase in sola lettura.
+    """
+    _name = 'helpdesk.ticket.resolution.report'
+    _description = 'Analisi Risoluzione Ticket'
+    _auto = False
+    _rec_name = 'ticket_id'
+    _order = 'resolution_date desc'
+
+    ticket_id = fields.Many2one('helpdesk.ticket', string='Ticket', readonly=True)
+    team_id = fields.Many2one('helpdesk.team', string='Team', readonly=True)
+    user_id = fields.Many2one('res.users', string='Assegnato A', readonly=True)
+    create_date = fields.Datetime(string='Data Creazione', readonly=True)
+    resolution_date = fields.Datetime(string='Data Risoluzione', readonly=True)
+    resolution_hours = fields.Float(string='Ore per Risoluzione', readonly=True, aggregator='avg')
+    resolved_count = fields.Integer(string='Ticket Risolti', readonly=True)
+    reopen_count = fields.Integer(string='Riaperture', readonly=True)
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(f"""
+            CREATE OR REPLACE VIEW {self._table} AS (
+                SELECT ticket.id AS id,
+                       ticket.id AS ticket_id,
+                       ticket.team_id AS team_id,
+                       ticket.user_id AS user_id,
+                       ticket.create_date AS create_date,
+                       resolution.date AS resolution_date,
+                       EXTRACT(EPOCH FROM resolution.date - ticket.create_date) / 3600.0 AS resolution_hours,
+                       CASE WHEN resolution.date IS NULL THEN 0 ELSE 1 END AS resolved_count,
+                       COALESCE(reopen.reopen_count, 0) AS reopen_count
+                  FROM helpdesk_ticket ticket
+             LEFT JOIN LATERAL (
+                        SELECT MIN(log.date) AS date
+                          FROM helpdesk_ticket_stage_log log
+                         WHERE log.ticket_id = ticket.id
+                           AND log.event_type = 'stage'
+                           AND log.is_readonly_stage
+                       ) resolution ON TRUE
+             LEFT JOIN (
+                        SELECT ticket_id, COUNT(*) AS reopen_count
+                          FROM helpdesk_ticket_stage_log
+                         WHERE event_type = 'reopen'
+                      GROUP BY ticket_id
+                       ) reopen ON reopen.ticket_id = ticket.id
+                 WHERE EXISTS (
+                        SELECT 1
+                          FROM helpdesk_ticket_stage_log log
+                         WHERE log.ticket_id = ticket.id
+                       )
+            )
+        """)
@@ -2,34 +2,100 @@
 
 import { StatusBarField } from "@web/views/fields/statusbar/statusbar_field";
 import { patch } from "@web/core/utils/patch";
+import { useBus, useService } from "@web/core/utils/hooks";
+import { _t } from "@web/core/l10n/translation";
 
 /**
- * Patch selectItem to handle save errors gracefully.
+ * Chiave della cache delle fasi consentite: fase corrente, stato di
+ * riapertura e flag "chiuso". Quando cambiano, la voce in cache non è più
+ * valida e viene richiesta di nuovo.
+ */
+function getCacheKey(record) {
+    const stage = record.data.stage_id;
+    return `${stage ? stage[0] : false}-${Boolean(record.data.is_reopened)}-${Boolean(
+        record.data.is_closed_stage
+    )}`;
+}
+
+/**
+ * Patch selectItem to validate helpdesk stage changes before saving and to
+ * handle save errors gracefully.
  *
- * The original selectItem() calls record.update() (which optimistically
- * changes the UI) then record.save(). If the save fails (e.g. UserError
- * from server validation), the UI is left in an inconsistent state showing
- * the wrong stage with fields appearing editable.
+ * For closed helpdesk tickets, the allowed target stages are asked to the
+ * server (same rules as _check_stage_change_allowed) and cached per ticket
+ * for the lifetime of the field. Tickets that are not closed can move to
+ * any stage, so no RPC is made for them. A blocked move only costs that
+ * small RPC: a notification is shown and the record is neither updated
+ * nor saved. The cached entry is dropped whenever the record is (re)loaded
+ * from the server, so permission or stage configuration changes are picked
+ * up on the next reload.
  *
- * This patch uses the onError callback supported by record._save(), the
- * same mechanism Odoo's FormController uses. When save fails:
- *  1. discard() reverts record._changes and record.data synchronously
- *  2. record._load() reloads fresh data from the server, guaranteeing
- *     the record state matches the database (same as _save()'s own
- *     error handling when isInEdition=false)
- *  3. Promise.reject() propagates the error to Odoo's error service
+ * The original selectItem() calls record.update() (which optimistically
+ * changes the UI) then record.save(). If the save still fails (e.g.
+ * UserError from another server validation), the onError callback of
+ * record._save() is used, the same mechanism Odoo's FormController uses:
+ *  1. discard() reverts record._changes and record.data synchronously.
+ *     The failed write is rolled back on the server, so no field has
+ *     changed there and no reload of the record is needed
+ *  2. Promise.reject() propagates the error to Odoo's error service
  *     which shows the standard error dialog
- *  4. selectItem() resolves normally, letting OWL re-render cleanly
+ *  3. selectItem() resolves normally, letting OWL re-render cleanly
  */
 patch(StatusBarField.prototype, {
+    setup() {
+        super.setup(...arguments);
+        this.orm = useService("orm");
+        this.notification = useService("notification");
+        this.allowedStagesCache = new Map();
+        // Un aggiornamento del modello con il record non modificato è un
+        // (ri)caricamento dal server: la voce in cache va richiesta di nuovo
+        useBus(this.props.record.model.bus, "update", () => {
+            const { record } = this.props;
+            if (!record.dirty) {
+                this.allowedStagesCache.delete(record.resId);
+            }
+        });
+    },
+
+    async getAllowedStageIds(record) {
+        const key = getCacheKey(record);
+        const cached = this.allowedStagesCache.get(record.resId);
+        if (cached && cached.key === key) {
+            return cached.stageIds;
+        }
+        const stageIds = await this.orm.call(record.resModel, "get_allowed_stage_ids", [
+            [record.resId],
+        ]);
+        this.allowedStagesCache.set(record.resId, { key, stageIds });
+        return stageIds;
+    },
+
     async selectItem(item) {
         const { name, record } = this.props;
+        if (
+            record.resModel === "helpdesk.ticket" &&
+            name === "stage_id" &&
+            record.resId &&
+            record.data.is_closed_stage
+        ) {
+            const allowedStageIds = await this.getAllowedStageIds(record);
+            if (!allowedStageIds.includes(item.value)) {
+                this.notification.add(
+                    _t(
+                        "Non è possibile spostare il ticket alla fase '%s' perché è già stato risolto. Contatta un amministratore se necessario.",
+                        item.label
+                    ),
+                    { type: "danger" }
+                );
+                return;
+            }
+        }
         const value = this.field.type === "many2one" ? [item.value, item.label] : item.value;
         await record.update({ [name]: value });
         await record.save({
             onError: async (error, { discard }) => {
                 discard();
-                await record._load({});
+                this.allowedStagesCache.delete(record.resId);
                 Promise.reject(error);
             },
         });
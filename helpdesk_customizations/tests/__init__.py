@@ -0,0 +1 @@
+from . import test_helpdesk_ticket_bulk
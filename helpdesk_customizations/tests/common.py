@@ -0,0 +1,28 @@
+from odoo import Command
+from odoo.tests import TransactionCase
+
+
+class HelpdeskCustomizationsCommon(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.team = cls.env['helpdesk.team'].create({
+            'name': 'Team Test',
+            'use_sla': False,
+        })
+        cls.stage_new, cls.stage_resolved, cls.stage_to_invoice = cls.env['helpdesk.stage'].create([
+            {'name': 'Nuovo', 'sequence': 1, 'team_ids': [Command.link(cls.team.id)]},
+            {'name': 'Risolto', 'sequence': 10, 'fold': True, 'is_readonly_stage': True,
+             'team_ids': [Command.link(cls.team.id)]},
+            {'name': 'Da Fatturare', 'sequence': 20, 'is_readonly_stage': True,
+             'team_ids': [Command.link(cls.team.id)]},
+        ])
+
+    @classmethod
+    def _create_tickets(cls, count, stage):
+        return cls.env['helpdesk.ticket'].create([{
+            'name': f'Ticket Test {index}',
+            'team_id': cls.team.id,
+            'stage_id': stage.id,
+        } for index in range(count)])
@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+from odoo import fields
+from odoo.exceptions import UserError
+from odoo.tests import new_test_user, tagged
+
+from .common import HelpdeskCustomizationsCommon
+
+
+@tagged('post_install', '-at_install')
+class TestHelpdeskTicketBulk(HelpdeskCustomizationsCommon):
+
+    def test_mass_move_restores_close_date(self):
+        """
+        Lo spostamento di 1000 ticket chiusi in una fase non chiusa ripristina
+        la data di chiusura (e ricalcola close_hours) con un numero di query
+        indipendente dal numero di ticket.
+        Il tracking dei campi (un messaggio per ticket nel modulo standard) è
+        disattivato per misurare solo la write e il ripristino.
+        """
+        close_date = fields.Datetime.now() + timedelta(days=7)
+        tickets = self._create_tickets(1000, self.stage_resolved).with_context(mail_notrack=True)
+        tickets.close_date = close_date
+        close_hours = tickets.mapped('close_hours')
+        self.assertTrue(all(close_hours))
+
+        # Riscaldamento delle cache del registro su pochi ticket
+        warmup_tickets = self._create_tickets(2, self.stage_resolved).with_context(mail_notrack=True)
+        warmup_tickets.close_date = close_date
+        warmup_tickets.stage_id = self.stage_to_invoice
+
+        with self.assertQueryCount(150):
+            tickets.write({'stage_id': self.stage_to_invoice.id})
+
+        self.assertEqual(set(tickets.mapped('stage_id')), {self.stage_to_invoice})
+        self.assertEqual(set(tickets.mapped('close_date')), {close_date})
+        tickets.invalidate_recordset(['close_date', 'close_hours'])
+        self.assertEqual(set(tickets.mapped('close_date')), {close_date})
+        self.assertEqual(tickets.mapped('close_hours'), close_hours)
+
+    def test_mass_stage_check_query_count(self):
+        """
+        Il controllo dello spostamento di 1000 ticket chiusi a una fase
+        precedente è una sola passata sul recordset: le query non dipendono
+        dal numero di ticket.
+        """
+        tickets = self._create_tickets(1000, self.stage_to_invoice)
+        self.env.invalidate_all()
+        with self.assertQueryCount(10):
+            tickets._check_stage_change_allowed(self.stage_new.id)
+
+        user = new_test_user(self.env, login='helpdesk_user_test', groups='helpdesk.group_helpdesk_user')
+        with self.assertRaises(UserError):
+            tickets.with_user(user)._check_stage_change_allowed(self.stage_new.id)
+        # Spostamento in avanti sempre consentito
+        tickets.with_user(user)._check_stage_change_allowed(self.stage_to_invoice.id)
+
+    def test_mass_reopen_query_count(self):
+        """
+        La riapertura di 1000 ticket chiusi scrive il flag con una sola write
+        e registra una nota per ticket con un'unica creazione di messaggi: le
+        query non dipendono dal numero di ticket.
+        """
+        tickets = self._create_tickets(1000, self.stage_resolved)
+        self._create_tickets(2, self.stage_resolved).action_reopen_ticket()
+        self.env.invalidate_all()
+
+        with self.assertQueryCount(100):
+            tickets.action_reopen_ticket()
+
+        self.assertTrue(all(tickets.mapped('is_reopened')))
+        self.assertFalse(any(tickets.mapped('is_closed_stage')))
+        messages = self.env['mail.message'].search([
+            ('model', '=', 'helpdesk.ticket'),
+            ('res_id', 'in', tickets.ids),
+            ('message_type', '=', 'notification'),
+            ('body', 'ilike', 'Ticket riaperto'),
+        ])
+        self.assertEqual(len(messages), 1000)
+
+    def test_mass_assignment_single_notification(self):
+        """
+        L'assegnazione di 1000 ticket a un utente invia un solo riepilogo
+        (un messaggio, una mail) invece di una notifica per ticket.
+        """
+        user = new_test_user(
+            self.env, login='helpdesk_assignee_test', groups='helpdesk.group_helpdesk_user',
+            email='assignee@example.com', notification_type='email',
+        )
+        tickets = self._create_tickets(1000, self.stage_new).with_context(mail_notrack=True)
+        self.env.invalidate_all()
+        messages_before = self.env['mail.message'].search([('partner_ids', 'in', user.partner_id.ids)])
+
+        with self.assertQueryCount(200):
+            tickets.write({'user_id': user.id})
+
+        messages = self.env['mail.message'].search([('partner_ids', 'in', user.partner_id.ids)]) - messages_before
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(len(self.env['mail.mail'].search([('mail_message_id', 'in', messages.ids)])), 1)
+        self.assertIn(tickets[0].name, messages.body)
@@ -1,6 +1,6 @@
 {
     'name': 'Sale Subscription Customizations',
-    'version': '18.0.1.0.0',
+    'version': '18.0.1.2.0',
     'category': 'Sales/Subscriptions',
     'summary': 'Customizzazioni modulo Abbonamenti',
     'description': """
@@ -9,15 +9,25 @@
         - Data inizio NON valorizzata automaticamente alla conferma preventivo
         - Data inizio copiata dalla "Data consegna impegnata" (modificabile)
         - Calcolo automatico data fine = data inizio + durata
-        - Alert attività assegnata al venditore 1 mese prima della scadenza
+        - Alert di scadenza a più fasi (90/60/30/7 giorni) configurabili
         - Campo "Codice Noleggio" per identificare univocamente gli abbonamenti
         - Codice Noleggio visibile nelle righe fattura e nel report PDF
+        - Riepilogo fatturato/incassato per Codice Noleggio
+        - Calendario rinnovi (fatturazioni, scadenze, alert) precalcolato
+        - Importazione massiva di abbonamenti da CSV a blocchi, in background
     """,
     'author': 'Mistral',
     'website': '',
     'depends': ['sale_subscription', 'account'],
     'data': [
+        'security/ir.model.access.csv',
+        'data/sale_subscription_alert_stage_data.xml',
         'views/sale_order_views.xml',
+        'views/sale_subscription_alert_stage_views.xml',
+        'views/sale_subscription_rental_ledger_views.xml',
+        'views/sale_subscription_calendar_event_views.xml',
+        'views/sale_subscription_import_job_views.xml',
+        'wizard/sale_subscription_import_views.xml',
         'views/account_move_views.xml',
         'report/report_invoice.xml',
         'data/ir_cron_data.xml',
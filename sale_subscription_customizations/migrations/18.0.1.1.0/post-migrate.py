@@ -0,0 +1,23 @@
+from odoo import api, SUPERUSER_ID
+from odoo.tools.sql import column_exists
+
+
+def migrate(cr, version):
+    """
+    Il flag expiration_alert_sent è stato sostituito dalla fase di alert
+    expiration_alert_stage_id. Gli ordini che avevano già ricevuto l'alert
+    (a 1 mese dalla scadenza) vengono collegati alla fase dei 30 giorni,
+    così non ricevono di nuovo gli alert precedenti.
+    """
+    if not column_exists(cr, 'sale_order', 'expiration_alert_sent'):
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    stage = env.ref('sale_subscription_customizations.alert_stage_30', raise_if_not_found=False)
+    if not stage:
+        return
+    cr.execute("""
+        UPDATE sale_order
+           SET expiration_alert_stage_id = %s
+         WHERE expiration_alert_sent
+           AND expiration_alert_stage_id IS NULL
+    """, (stage.id,))
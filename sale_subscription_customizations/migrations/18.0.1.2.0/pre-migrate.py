@@ -0,0 +1,33 @@
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """
+    Il vincolo codice_noleggio_active_uniq richiede un Codice Noleggio univoco
+    tra gli abbonamenti in corso o in pausa. Se esistono già duplicati Odoo
+    non riesce a creare il vincolo (messaggio "unable to add constraint" nel
+    log) e l'univocità non viene verificata: i duplicati vengono elencati qui.
+    Dopo averli corretti (codice modificato o abbonamento chiuso), aggiornare
+    di nuovo il modulo per creare il vincolo.
+    """
+    cr.execute("""
+        SELECT codice_noleggio, ARRAY_AGG(name ORDER BY id)
+          FROM sale_order
+         WHERE is_subscription = TRUE
+           AND subscription_state IN ('3_progress', '4_paused')
+           AND codice_noleggio IS NOT NULL
+      GROUP BY codice_noleggio
+        HAVING COUNT(*) > 1
+      ORDER BY codice_noleggio
+    """)
+    duplicates = cr.fetchall()
+    if not duplicates:
+        return
+    _logger.warning(
+        "Codice Noleggio duplicati tra gli abbonamenti attivi: il vincolo "
+        "codice_noleggio_active_uniq non verrà creato finché non vengono corretti, "
+        "poi aggiornare di nuovo il modulo.\n%s",
+        "\n".join(f"{code}: {', '.join(names)}" for code, names in duplicates),
+    )
@@ -1,3 +1,8 @@
+from . import sale_subscription_alert_stage
 from . import sale_order
+from . import sale_subscription_calendar_event
 from . import sale_order_line
 from . import account_move_line
+from . import sale_subscription_rental_ledger
+from . import sale_subscription_import_job
+from . import sale_subscription_import_job_chunk
@@ -6,6 +6,16 @@ class AccountMoveLine(models.Model):
 
     codice_noleggio = fields.Char(
         string='Codice Noleggio',
+        index='trigram',
         help='Codice noleggio proveniente dall\'ordine di vendita in abbonamento.',
         copy=False
     )
+
+    def write(self, vals):
+        # I codici noleggio rimossi o sostituiti vanno ricalcolati nel
+        # riepilogo di fatturazione: non sono più ritrovabili da write_date
+        if 'codice_noleggio' in vals:
+            self.env['sale.subscription.rental.ledger']._mark_codes_dirty(
+                set(self.mapped('codice_noleggio')) - {vals['codice_noleggio']}
+            )
+        return super().write(vals)
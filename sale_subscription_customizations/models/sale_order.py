@@ -1,7 +1,19 @@
-from odoo import api, fields, models, _
+from collections import defaultdict
+
+from odoo import api, fields, models, tools, _
+from odoo.tools import SQL
+from odoo.tools.sql import constraint_definition, create_index
 from dateutil.relativedelta import relativedelta
 
 
+# Campi che modificano gli eventi del calendario rinnovi
+SUBSCRIPTION_CALENDAR_FIELDS = [
+    'start_date', 'end_date', 'next_invoice_date', 'subscription_duration',
+    'subscription_duration_unit', 'plan_id', 'subscription_state',
+    'partner_id', 'user_id', 'company_id', 'codice_noleggio',
+]
+
+
 class SaleOrder(models.Model):
     _inherit = 'sale.order'
 
@@ -30,20 +42,86 @@ class SaleOrder(models.Model):
         help='True se l\'abbonamento ha una data di scadenza definita.'
     )
 
-    # Campo per tracciare se l'alert di scadenza è stato già creato
-    expiration_alert_sent = fields.Boolean(
-        string='Alert Scadenza Inviato',
-        default=False,
-        help='True se l\'attività di alert per la scadenza è già stata creata.'
+    # Ultima fase di alert scadenza per cui è stata creata l'attività
+    expiration_alert_stage_id = fields.Many2one(
+        'sale.subscription.alert.stage',
+        string='Ultimo Alert Scadenza',
+        copy=False,
+        ondelete='set null',
+        help='Ultima fase di alert per la scadenza per cui è già stata creata l\'attività.'
     )
 
     # Campo per identificare univocamente il noleggio/abbonamento nelle fatture
     codice_noleggio = fields.Char(
         string='Codice Noleggio',
+        index='trigram',
         help='Codice identificativo univoco del noleggio/abbonamento. '
              'Verrà riportato nelle righe fattura per identificare la provenienza.'
     )
 
+    # Codice noleggio univoco tra gli abbonamenti attivi (in corso o in pausa).
+    # Vincolo differibile: durante la conferma di un rinnovo l'ordine rinnovato
+    # e il nuovo ordine sono entrambi attivi per qualche istante. Il controllo
+    # viene comunque anticipato da _check_codice_noleggio_unique al termine di
+    # write/action_confirm, così la violazione viene tradotta nel messaggio del
+    # vincolo invece di emergere al COMMIT come errore del server.
+    _sql_constraints = [
+        ('codice_noleggio_active_uniq',
+         "EXCLUDE (codice_noleggio WITH =) "
+         "WHERE (is_subscription = TRUE AND subscription_state IN ('3_progress', '4_paused') "
+         "AND codice_noleggio IS NOT NULL) "
+         "DEFERRABLE INITIALLY DEFERRED",
+         'Il Codice Noleggio deve essere univoco tra gli abbonamenti attivi.'),
+    ]
+
+    def init(self):
+        super().init()
+        # Indice parziale per il cron degli alert di scadenza: contiene solo gli
+        # abbonamenti in corso con data fine, ordinati per end_date, così la
+        # ricerca per intervallo di scadenza non scansiona tutti i preventivi.
+        # La fase di alert già inviata non fa parte del predicato: il filtro
+        # viene applicato sulle poche righe dell'intervallo.
+        # Verifica: EXPLAIN sulla query di _cron_create_expiration_alerts deve
+        # mostrare "Index Scan using sale_order_subscription_expiration_idx"
+        # (vedi tests/test_sale_order_expiration_index.py).
+        create_index(
+            self.env.cr,
+            'sale_order_subscription_expiration_idx',
+            self._table,
+            ['end_date'],
+            where="is_subscription = TRUE AND subscription_state = '3_progress' AND end_date IS NOT NULL",
+        )
+
+    @api.model
+    @tools.ormcache()
+    def _has_codice_noleggio_constraint(self):
+        """
+        True se il vincolo codice_noleggio_active_uniq esiste nel database.
+        Su database con codici duplicati tra gli abbonamenti attivi Odoo non
+        riesce a crearlo (vedi migrations/18.0.1.2.0/pre-migrate.py) e si
+        limita a registrarlo nel log. Il risultato resta in cache fino al
+        prossimo caricamento del registro (es. aggiornamento del modulo).
+        """
+        return bool(constraint_definition(
+            self.env.cr, self._table, f'{self._table}_codice_noleggio_active_uniq'
+        ))
+
+    def _check_codice_noleggio_unique(self):
+        """
+        Verifica subito il vincolo differibile codice_noleggio_active_uniq
+        sulle modifiche già scritte, poi lo rimette in modalità differita per
+        il resto della transazione. Se il vincolo non esiste la verifica
+        viene saltata.
+        """
+        if self.env.context.get('defer_codice_noleggio_check') or not any(self.mapped('is_subscription')):
+            return
+        if not self._has_codice_noleggio_constraint():
+            return
+        self.flush_model(['codice_noleggio', 'is_subscription', 'subscription_state'])
+        constraint = SQL.identifier(f'{self._table}_codice_noleggio_active_uniq')
+        self.env.cr.execute(SQL("SET CONSTRAINTS %s IMMEDIATE", constraint))
+        self.env.cr.execute(SQL("SET CONSTRAINTS %s DEFERRED", constraint))
+
     @api.depends('subscription_duration')
     def _compute_has_subscription_end(self):
         for order in self:
@@ -106,6 +184,65 @@ class SaleOrder(models.Model):
             if not self.next_invoice_date:
                 self.next_invoice_date = self.commitment_date.date()
 
+    def _get_write_vals_groups(self, vals):
+        """
+        Suddivide il recordset in gruppi omogenei e restituisce, per ciascun
+        gruppo, i vals da scrivere:
+        - ordini che ricevono commitment_date per la prima volta: start_date e
+          next_invoice_date vengono copiati dalla data consegna (se non già nei vals)
+        - abbonamenti senza commitment_date: le date impostate automaticamente
+          vengono rimosse (end_date e next_invoice_date solo se manca start_date)
+        - tutti gli altri ordini: vals invariati
+        I gruppi con vals identici vengono uniti, così una write su molti record
+        si traduce in poche write, una per combinazione di vals.
+
+        :return: lista di tuple (ordini, vals)
+        """
+        new_date = False
+        commitment_dt = vals.get('commitment_date')
+        if commitment_dt:
+            if isinstance(commitment_dt, str):
+                commitment_dt = fields.Datetime.from_string(commitment_dt)
+            new_date = commitment_dt.date() if hasattr(commitment_dt, 'date') else commitment_dt
+
+        def get_group_key(order):
+            # Se commitment_date è già valorizzato, permettiamo la modifica di start_date
+            # (l'utente può modificare manualmente la data di inizio)
+            if order.commitment_date:
+                return 'default'
+            # commitment_date viene valorizzato per la prima volta
+            if new_date:
+                return 'first_commitment'
+            # Subscription senza commitment_date: blocca la scrittura automatica delle date
+            if order.is_subscription:
+                return 'blocked_with_start' if order.start_date else 'blocked'
+            return 'default'
+
+        vals_by_key = {
+            'default': vals,
+            # Imposta start_date/next_invoice_date solo se non già nei vals (modifica manuale)
+            'first_commitment': {'start_date': new_date, 'next_invoice_date': new_date, **vals},
+            'blocked_with_start': {
+                fname: value for fname, value in vals.items()
+                if not (fname == 'start_date' and value)
+            },
+            'blocked': {
+                fname: value for fname, value in vals.items()
+                if not (fname in ('start_date', 'next_invoice_date', 'end_date') and value)
+            },
+        }
+
+        groups = []
+        for key, orders in self.grouped(get_group_key).items():
+            group_vals = vals_by_key[key]
+            for index, (group_orders, other_vals) in enumerate(groups):
+                if other_vals == group_vals:
+                    groups[index] = (group_orders | orders, other_vals)
+                    break
+            else:
+                groups.append((orders, group_vals))
+        return groups
+
     def write(self, vals):
         """
         Override write per:
@@ -113,58 +250,57 @@ class SaleOrder(models.Model):
            MA permettere la modifica manuale se commitment_date è già valorizzato
         2. Copiare commitment_date in start_date quando viene valorizzato per la prima volta
         3. Ricalcolare end_date quando necessario
+        Gli ordini vengono partizionati in gruppi omogenei (vedi
+        _get_write_vals_groups) e ogni gruppo riceve una sola write con i propri vals.
+        Con il contesto subscription_import_mode la logica sulle date è sospesa:
+        viene applicata in blocco da _apply_subscription_import_dates.
         """
-        for order in self:
-            # Se è una subscription e commitment_date è vuoto,
-            # blocca la scrittura automatica di start_date, next_invoice_date, end_date
-            if order.is_subscription and not order.commitment_date:
-                # Rimuovi le date dai vals se non c'è commitment_date
-                # a meno che non stia venendo scritto commitment_date stesso
-                if 'commitment_date' not in vals or not vals.get('commitment_date'):
-                    if 'start_date' in vals and vals['start_date']:
-                        # Blocca: non permettere di impostare start_date automaticamente
-                        vals.pop('start_date', None)
-                    if 'next_invoice_date' in vals and vals['next_invoice_date'] and not order.start_date:
-                        vals.pop('next_invoice_date', None)
-                    if 'end_date' in vals and vals['end_date'] and not order.start_date:
-                        vals.pop('end_date', None)
-            # Se commitment_date è già valorizzato, permettiamo la modifica di start_date
-            # (l'utente può modificare manualmente la data di inizio)
-
-        # Se viene scritto commitment_date per la prima volta, aggiorniamo anche start_date
-        # MA solo se start_date non è già stato modificato manualmente
-        if 'commitment_date' in vals and vals['commitment_date']:
-            # Verifichiamo se è un nuovo commitment_date (non una modifica)
-            for order in self:
-                if not order.commitment_date:
-                    # commitment_date viene valorizzato per la prima volta
-                    commitment_dt = vals['commitment_date']
-                    if isinstance(commitment_dt, str):
-                        from odoo import fields as odoo_fields
-                        commitment_dt = odoo_fields.Datetime.from_string(commitment_dt)
-                    if hasattr(commitment_dt, 'date'):
-                        new_date = commitment_dt.date()
-                    else:
-                        new_date = commitment_dt
-                    # Imposta start_date solo se non è già nei vals (modifica manuale)
-                    if 'start_date' not in vals:
-                        vals['start_date'] = new_date
-                    if 'next_invoice_date' not in vals:
-                        vals['next_invoice_date'] = new_date
-                    break  # Evitiamo di processare più volte
-
-        res = super().write(vals)
-
-        # Se sono stati modificati i campi rilevanti, ricalcola end_date
-        if any(f in vals for f in ['start_date', 'subscription_duration', 'subscription_duration_unit']):
-            for order in self:
-                if order.is_subscription and order.start_date:
-                    order._compute_end_date_from_duration()
-                    # Se start_date è cambiato, aggiorna anche next_invoice_date
-                    # solo se next_invoice_date era uguale al vecchio start_date o vuoto
-                    if 'start_date' in vals:
-                        if not order.next_invoice_date or order.next_invoice_date < order.start_date:
-                            order.next_invoice_date = order.start_date
+        # I codici noleggio sostituiti vanno ricalcolati nel riepilogo di
+        # fatturazione (vedi SaleSubscriptionRentalLedger._mark_codes_dirty)
+        if 'codice_noleggio' in vals:
+            self.env['sale.subscription.rental.ledger']._mark_codes_dirty(
+                set(self.mapped('codice_noleggio')) - {vals['codice_noleggio']}
+            )
+
+        if self.env.context.get('subscription_import_mode'):
+            return super().write(vals)
+
+        res = True
+        orders_to_recompute = self.browse()
+        orders_with_new_start = self.browse()
+        calendar_orders = self.browse()
+        for orders, group_vals in self._get_write_vals_groups(vals):
+            res = super(SaleOrder, orders).write(group_vals) and res
+            # Se sono stati modificati i campi rilevanti, ricalcola end_date
+            if any(f in group_vals for f in ['start_date', 'subscription_duration', 'subscription_duration_unit']):
+                orders_to_recompute |= orders
+                if 'start_date' in group_vals:
+                    orders_with_new_start |= orders
+            if any(f in group_vals for f in SUBSCRIPTION_CALENDAR_FIELDS):
+                # Solo gli abbonamenti hanno eventi nel calendario; con il
+                # cambio di piano anche gli ordini che non lo sono più, per
+                # rimuoverne gli eventi
+                calendar_orders |= orders if 'plan_id' in group_vals else orders.filtered('is_subscription')
+
+        # Le write interne di end_date/next_invoice_date non aggiornano il
+        # calendario: viene aggiornato una volta sola alla fine
+        orders_to_recompute = orders_to_recompute.with_context(
+            skip_subscription_calendar_sync=True
+        ).filtered(lambda o: o.is_subscription and o.start_date)
+        orders_to_recompute._compute_end_date_from_duration()
+        # Se start_date è cambiato, aggiorna anche next_invoice_date
+        # solo se next_invoice_date era precedente alla nuova start_date o vuoto
+        orders_to_update = (orders_with_new_start & orders_to_recompute).filtered(
+            lambda o: not o.next_invoice_date or o.next_invoice_date < o.start_date
+        )
+        for start_date, group in orders_to_update.grouped('start_date').items():
+            group.next_invoice_date = start_date
+
+        if calendar_orders and not self.env.context.get('skip_subscription_calendar_sync'):
+            calendar_orders._sync_subscription_calendar()
+
+        if 'codice_noleggio' in vals or 'subscription_state' in vals:
+            self._check_codice_noleggio_unique()
 
         return res
 
@@ -175,42 +311,175 @@ class SaleOrder(models.Model):
         Pre-imposta temporaneamente le date per subscription senza commitment_date
         per evitare crash nel codice enterprise (project_sale_subscription).
         """
-        orders_without_commitment = {}
+        orders_without_commitment = self.filtered(
+            lambda o: o.is_subscription and not o.commitment_date
+        )
         today = fields.Date.today()
 
-        for order in self:
-            if order.is_subscription and not order.commitment_date:
-                orders_without_commitment[order.id] = True
-                # Imposta temporaneamente le date via SQL per bypassare
-                # il write override che blocca la scrittura
-                self.env.cr.execute("""
-                    UPDATE sale_order
-                    SET start_date = %s,
-                        next_invoice_date = %s
-                    WHERE id = %s
-                """, (today, today, order.id))
+        if orders_without_commitment:
+            # Imposta temporaneamente le date via SQL per bypassare
+            # il write override che blocca la scrittura.
+            # Un solo statement per tutti gli ordini coinvolti.
+            orders_without_commitment.flush_recordset(['start_date', 'next_invoice_date'])
+            self.env.cr.execute("""
+                UPDATE sale_order
+                SET start_date = %s,
+                    next_invoice_date = %s
+                WHERE id = ANY(%s)
+            """, (today, today, orders_without_commitment.ids))
+            orders_without_commitment.invalidate_recordset(['start_date', 'next_invoice_date'])
+
+        # Chiamiamo il metodo originale - ora non crasherà.
+        # L'univocità del codice noleggio viene verificata solo a conferma
+        # completata, quando l'eventuale ordine rinnovato è già chiuso.
+        res = super(SaleOrder, self.with_context(defer_codice_noleggio_check=True)).action_confirm()
+        self._check_codice_noleggio_unique()
 
+        # Per gli ordini senza commitment_date, resettiamo le date a NULL
         if orders_without_commitment:
-            self.invalidate_recordset(['start_date', 'next_invoice_date'])
+            # Scriviamo su DB eventuali modifiche pendenti del super()
+            # prima di sovrascriverle via SQL
+            orders_without_commitment.flush_recordset(['start_date', 'next_invoice_date', 'end_date'])
+            self.env.cr.execute("""
+                UPDATE sale_order
+                SET start_date = NULL,
+                    next_invoice_date = NULL,
+                    end_date = NULL
+                WHERE id = ANY(%s)
+            """, (orders_without_commitment.ids,))
+            orders_without_commitment.invalidate_recordset(['start_date', 'next_invoice_date', 'end_date'])
+            # Le date temporanee sono passate dal calendario: lo riallineiamo
+            orders_without_commitment._sync_subscription_calendar()
 
-        # Chiamiamo il metodo originale - ora non crasherà
-        res = super().action_confirm()
+        return res
 
-        # Per gli ordini senza commitment_date, resettiamo le date a NULL
+    def _create_invoices(self, grouped=False, final=False, date=None):
+        """
+        Override per risolvere il codice noleggio una sola volta per ordine:
+        la mappa ordine -> codice viene passata nel contesto e letta da
+        SaleOrderLine._prepare_invoice_line per tutte le righe dell'ordine.
+        """
+        codice_noleggio_by_order = {
+            order.id: order.codice_noleggio
+            for order in self
+            if order.plan_id and order.codice_noleggio
+        }
+        moves = super(
+            SaleOrder, self.with_context(codice_noleggio_by_order=codice_noleggio_by_order)
+        )._create_invoices(grouped=grouped, final=final, date=date)
+        # La mappa serve solo per la preparazione delle righe
+        return moves.with_env(self.env)
+
+    def _get_subscription_calendar_vals(self):
+        """
+        Restituisce i valori degli eventi futuri del calendario rinnovi:
+        - fatturazioni da next_invoice_date secondo il periodo del piano,
+          fino alla data fine (esclusa) o all'orizzonte
+        - scadenza alla data fine
+        - alert alla data fine meno i giorni di ogni fase di alert attiva
+        Sono considerati solo gli abbonamenti in corso o in pausa e gli eventi
+        tra oggi e l'orizzonte (parametro di sistema
+        sale_subscription_customizations.calendar_horizon_months, default 12).
+        """
+        today = fields.Date.today()
+        horizon_months = int(self.env['ir.config_parameter'].sudo().get_param(
+            'sale_subscription_customizations.calendar_horizon_months', 12
+        ))
+        horizon = today + relativedelta(months=horizon_months)
+        stages = self.env['sale.subscription.alert.stage'].search([])
+
+        vals_list = []
         for order in self:
-            if orders_without_commitment.get(order.id):
-                self.env.cr.execute("""
-                    UPDATE sale_order
-                    SET start_date = NULL,
-                        next_invoice_date = NULL,
-                        end_date = NULL
-                    WHERE id = %s
-                """, (order.id,))
+            if not order.is_subscription or order.subscription_state not in ('3_progress', '4_paused'):
+                continue
+            common_vals = {
+                'order_id': order.id,
+                'partner_id': order.partner_id.id,
+                'user_id': order.user_id.id,
+                'company_id': order.company_id.id,
+                'plan_id': order.plan_id.id,
+                'codice_noleggio': order.codice_noleggio,
+            }
+            end_date = order.end_date
+
+            # Fatturazioni: calcolate dalla prima data per evitare la deriva
+            # del clamping di fine mese
+            plan = order.plan_id
+            if order.next_invoice_date and plan and plan.billing_period_value > 0:
+                last_date = min(horizon, end_date - relativedelta(days=1)) if end_date else horizon
+                period_unit = f'{plan.billing_period_unit}s'
+                period_count = 0
+                invoice_date = order.next_invoice_date
+                while invoice_date <= last_date:
+                    if invoice_date >= today:
+                        vals_list.append({**common_vals, 'event_type': 'invoice', 'date': invoice_date})
+                    period_count += 1
+                    invoice_date = order.next_invoice_date + relativedelta(
+                        **{period_unit: plan.billing_period_value * period_count}
+                    )
 
-        if orders_without_commitment:
-            self.invalidate_recordset(['start_date', 'next_invoice_date', 'end_date'])
+            if not end_date:
+                continue
+            if today <= end_date <= horizon:
+                vals_list.append({**common_vals, 'event_type': 'expiry', 'date': end_date})
+            for stage in stages:
+                alert_date = end_date - relativedelta(days=stage.days_before)
+                if today <= alert_date <= horizon:
+                    vals_list.append({
+                        **common_vals,
+                        'event_type': 'alert',
+                        'date': alert_date,
+                        'alert_stage_id': stage.id,
+                    })
+        return vals_list
+
+    def _sync_subscription_calendar(self):
+        """
+        Rigenera gli eventi del calendario rinnovi degli ordini: una
+        cancellazione e una creazione per tutto il recordset. Gli ordini non
+        più attivi perdono i loro eventi.
+        """
+        Event = self.env['sale.subscription.calendar.event'].sudo()
+        Event.search([('order_id', 'in', self.ids)]).unlink()
+        active_orders = self.filtered(
+            lambda o: o.is_subscription and o.subscription_state in ('3_progress', '4_paused')
+        )
+        if active_orders:
+            Event.create(active_orders._get_subscription_calendar_vals())
+
+    def _apply_subscription_import_dates(self):
+        """
+        Applica in un solo passaggio raggruppato la derivazione delle date
+        sospesa durante l'importazione (contesto subscription_import_mode):
+        commitment_date -> start_date -> next_invoice_date -> end_date.
+        Una write per data di inizio distinta e il calcolo raggruppato della
+        data fine, poi un solo aggiornamento del calendario rinnovi.
+        """
+        orders = self.with_context(subscription_import_mode=True).filtered(
+            lambda o: o.is_subscription and o.commitment_date and not o.start_date
+        )
+        for start_date, group in orders.grouped(lambda o: o.commitment_date.date()).items():
+            group.write({'start_date': start_date})
+            without_next_invoice = group.filtered(lambda o: not o.next_invoice_date)
+            if without_next_invoice:
+                without_next_invoice.write({'next_invoice_date': start_date})
+        self.with_context(subscription_import_mode=True).filtered(
+            lambda o: o.is_subscription and o.start_date
+        )._compute_end_date_from_duration()
+        self._sync_subscription_calendar()
 
-        return res
+    @api.model
+    def _get_subscription_duration_delta(self, duration, unit):
+        """
+        Restituisce il relativedelta corrispondente alla durata indicata,
+        oppure None se la durata non è valorizzata.
+        """
+        if duration > 0:
+            if unit == 'months':
+                return relativedelta(months=duration)
+            if unit == 'years':
+                return relativedelta(years=duration)
+        return None
 
     @api.depends('start_date', 'subscription_duration', 'subscription_duration_unit')
     def _compute_end_date_from_duration(self):
@@ -218,18 +487,26 @@ class SaleOrder(models.Model):
         Calcola la data di fine abbonamento basandosi su:
         - start_date + subscription_duration (in mesi o anni)
         Se subscription_duration è 0 o vuoto, end_date non viene impostata.
+        Gli ordini sono raggruppati per (durata, unità): il relativedelta viene
+        costruito una volta per gruppo e end_date viene scritta con una sola
+        write per ogni data fine distinta.
         """
-        for order in self:
-            if order.start_date and order.subscription_duration > 0:
-                if order.subscription_duration_unit == 'months':
-                    order.end_date = order.start_date + relativedelta(
-                        months=order.subscription_duration
-                    )
-                elif order.subscription_duration_unit == 'years':
-                    order.end_date = order.start_date + relativedelta(
-                        years=order.subscription_duration
-                    )
-            # Se duration è 0, non modifichiamo end_date (abbonamento senza scadenza)
+        order_ids_by_end_date = defaultdict(list)
+        groups = self.grouped(lambda o: (o.subscription_duration, o.subscription_duration_unit))
+        for (duration, unit), orders in groups.items():
+            delta = self._get_subscription_duration_delta(duration, unit)
+            if not delta:
+                # Se duration è 0, non modifichiamo end_date (abbonamento senza scadenza)
+                continue
+            for order in orders:
+                if not order.start_date:
+                    continue
+                end_date = order.start_date + delta
+                if order.end_date != end_date:
+                    order_ids_by_end_date[end_date].append(order.id)
+
+        for end_date, order_ids in order_ids_by_end_date.items():
+            self.browse(order_ids).end_date = end_date
 
     @api.onchange('start_date', 'subscription_duration', 'subscription_duration_unit')
     def _onchange_compute_end_date(self):
@@ -245,40 +522,126 @@ class SaleOrder(models.Model):
                 self.next_invoice_date = self.start_date
 
     @api.model
-    def _cron_create_expiration_alerts(self):
+    def _get_expiration_alerts_due_query(self, today, horizon, limit=None):
         """
-        Cron job che crea attività per gli ordini in abbonamento
-        che scadono entro 1 mese.
+        Query di classificazione degli alert dovuti (vedi
+        _get_expiration_alerts_due): il predicato su abbonamento, stato e
+        end_date coincide con quello dell'indice parziale
+        sale_order_subscription_expiration_idx.
         """
+        return SQL("""
+            SELECT so.id, stage.id
+              FROM sale_order so
+              JOIN LATERAL (
+                    SELECT st.id, st.days_before
+                      FROM sale_subscription_alert_stage st
+                     WHERE st.active
+                       AND st.days_before >= so.end_date - %(today)s
+                  ORDER BY st.days_before
+                     LIMIT 1
+                   ) stage ON TRUE
+         LEFT JOIN sale_subscription_alert_stage last_stage
+                ON last_stage.id = so.expiration_alert_stage_id
+             WHERE so.is_subscription = TRUE
+               AND so.subscription_state = '3_progress'
+               AND so.end_date IS NOT NULL
+               AND so.end_date > %(today)s
+               AND so.end_date <= %(horizon)s
+               AND (last_stage.id IS NULL OR last_stage.days_before > stage.days_before)
+          ORDER BY so.id
+          %(limit)s
+        """, today=today, horizon=horizon, limit=SQL("LIMIT %s", limit) if limit else SQL())
+
+    @api.model
+    def _prepare_expiration_alerts_due_query(self, limit=None):
+        """
+        Restituisce la query degli alert dovuti per la data odierna, oppure
+        None se non ci sono fasi di alert attive.
+        """
+        stages = self.env['sale.subscription.alert.stage'].search([])
+        if not stages:
+            return None
         today = fields.Date.today()
-        one_month_later = today + relativedelta(months=1)
-
-        # Cerca abbonamenti attivi con scadenza entro 1 mese
-        # che non hanno già ricevuto l'alert
-        orders_to_alert = self.search([
-            ('is_subscription', '=', True),
-            ('subscription_state', '=', '3_progress'),  # In corso
-            ('end_date', '!=', False),
-            ('end_date', '<=', one_month_later),
-            ('end_date', '>', today),  # Non già scaduti
-            ('expiration_alert_sent', '=', False),
+        horizon = today + relativedelta(days=max(stages.mapped('days_before')))
+
+        self.env['sale.subscription.alert.stage'].flush_model(['active', 'days_before'])
+        self.flush_model([
+            'is_subscription', 'subscription_state', 'end_date', 'expiration_alert_stage_id',
         ])
+        return self._get_expiration_alerts_due_query(today, horizon, limit=limit)
 
-        activity_type = self.env.ref('mail.mail_activity_data_todo', raise_if_not_found=False)
-        if not activity_type:
-            activity_type = self.env['mail.activity.type'].search([
-                ('name', 'ilike', 'To Do')
-            ], limit=1)
+    @api.model
+    def _get_expiration_alerts_due(self, limit=None):
+        """
+        Classifica in una sola query (sull'indice parziale di scadenza) gli
+        abbonamenti in corso che devono ricevere un alert.
+        Per ogni ordine la fase dovuta è quella attiva con meno giorni che
+        copre ancora la scadenza; l'ordine è escluso se ha già ricevuto quella
+        fase o una successiva (con meno giorni).
+
+        :param limit: numero massimo di ordini restituiti
+        :return: lista di tuple (id ordine, id fase) ordinata per id ordine
+        """
+        query = self._prepare_expiration_alerts_due_query(limit=limit)
+        if query is None:
+            return []
+        self.env.cr.execute(query)
+        return self.env.cr.fetchall()
 
-        for order in orders_to_alert:
-            # Crea attività assegnata al venditore dell'ordine
-            user_id = order.user_id.id if order.user_id else self.env.user.id
+    @api.model
+    def _count_expiration_alerts_due(self):
+        """ Numero di abbonamenti che devono ancora ricevere un alert. """
+        query = self._prepare_expiration_alerts_due_query()
+        if query is None:
+            return 0
+        self.env.cr.execute(SQL("SELECT COUNT(*) FROM (%s) due", query))
+        return self.env.cr.fetchone()[0]
 
-            self.env['mail.activity'].create({
-                'res_model_id': self.env['ir.model']._get_id('sale.order'),
+    @api.model
+    def _cron_create_expiration_alerts(self):
+        """
+        Cron job che crea attività per gli ordini in abbonamento in scadenza,
+        secondo le fasi configurate (es. 90/60/30/7 giorni prima).
+        Tutte le fasi sono gestite nello stesso passaggio: gli ordini dovuti
+        sono classificati con una sola query e le attività create con una
+        sola create per blocco.
+        Gli ordini vengono elaborati a blocchi (parametro di sistema
+        sale_subscription_customizations.expiration_alert_batch_size):
+        ogni blocco viene committato dal cron, che si rilancia finché
+        restano ordini da elaborare. Il punto di ripresa è dato dal campo
+        expiration_alert_stage_id, per cui un timeout non annulla i blocchi già
+        completati.
+        """
+        batch_size = int(self.env['ir.config_parameter'].sudo().get_param(
+            'sale_subscription_customizations.expiration_alert_batch_size', 1000
+        ))
+
+        # Un ordine in più del blocco indica se ne restano da elaborare
+        alerts_due = self._get_expiration_alerts_due(limit=batch_size + 1)
+        batch = alerts_due[:batch_size]
+        if not batch:
+            self.env['ir.cron']._notify_progress(done=0, remaining=0)
+            return
+
+        today = fields.Date.today()
+        orders = self.browse([order_id for order_id, _stage_id in batch])
+        stages = self.env['sale.subscription.alert.stage'].browse({stage_id for _order_id, stage_id in batch})
+        default_activity_type = stages._get_default_activity_type()
+
+        # Valori comuni a tutte le attività, risolti una sola volta
+        res_model_id = self.env['ir.model']._get_id('sale.order')
+        summary = _('Abbonamento in scadenza')
+
+        activity_vals_list = []
+        order_ids_by_stage = defaultdict(list)
+        for order, (_order_id, stage_id) in zip(orders, batch):
+            stage = stages.browse(stage_id)
+            activity_type = stage.activity_type_id or default_activity_type
+            activity_vals_list.append({
+                'res_model_id': res_model_id,
                 'res_id': order.id,
-                'activity_type_id': activity_type.id if activity_type else False,
-                'summary': _('Abbonamento in scadenza'),
+                'activity_type_id': activity_type.id,
+                'summary': summary,
                 'note': _(
                     'L\'abbonamento %s scade il %s. '
                     'Contattare il cliente per il rinnovo.',
@@ -286,8 +649,16 @@ class SaleOrder(models.Model):
                     order.end_date.strftime('%d/%m/%Y') if order.end_date else ''
                 ),
                 'date_deadline': today,
-                'user_id': user_id,
+                'user_id': stage._get_assignee(order).id,
             })
+            order_ids_by_stage[stage].append(order.id)
+        self.env['mail.activity'].create(activity_vals_list)
+
+        # Segna la fase inviata: una write per fase
+        for stage, order_ids in order_ids_by_stage.items():
+            self.browse(order_ids).expiration_alert_stage_id = stage
 
-            # Segna l'alert come inviato
-            order.expiration_alert_sent = True
+        self.env['ir.cron']._notify_progress(
+            done=len(batch),
+            remaining=self._count_expiration_alerts_due() if len(alerts_due) > batch_size else 0,
+        )
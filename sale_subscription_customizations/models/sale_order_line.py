@@ -8,12 +8,23 @@ class SaleOrderLine(models.Model):
         """
         Override per propagare il codice noleggio dall'ordine di vendita
         alla riga fattura.
+        Durante _create_invoices i codici sono già risolti per ordine e passati
+        nel contesto (codice_noleggio_by_order), quindi non vengono riletti
+        dall'ordine per ogni riga.
         """
         res = super()._prepare_invoice_line(**optional_values)
 
+        codice_noleggio_by_order = self.env.context.get('codice_noleggio_by_order')
+        if codice_noleggio_by_order is not None:
+            codice_noleggio = codice_noleggio_by_order.get(self.order_id.id)
         # Propaga il codice noleggio dall'ordine di vendita
         # solo se l'ordine ha un piano ricorrente e un codice noleggio
-        if self.order_id.plan_id and self.order_id.codice_noleggio:
-            res['codice_noleggio'] = self.order_id.codice_noleggio
+        elif self.order_id.plan_id:
+            codice_noleggio = self.order_id.codice_noleggio
+        else:
+            codice_noleggio = False
+
+        if codice_noleggio:
+            res['codice_noleggio'] = codice_noleggio
 
         return res
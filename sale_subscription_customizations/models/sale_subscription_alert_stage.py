@@ -0,0 +1,78 @@
+from odoo import api, fields, models
+
+
+class SaleSubscriptionAlertStage(models.Model):
+    _name = 'sale.subscription.alert.stage'
+    _description = 'Fase Alert Scadenza Abbonamento'
+    _order = 'days_before desc, id'
+
+    name = fields.Char(
+        string='Nome',
+        required=True,
+        translate=True,
+    )
+
+    active = fields.Boolean(
+        string='Attivo',
+        default=True,
+    )
+
+    days_before = fields.Integer(
+        string='Giorni Prima della Scadenza',
+        required=True,
+        help='Numero di giorni prima della data fine abbonamento in cui '
+             'viene creata l\'attività di alert.'
+    )
+
+    activity_type_id = fields.Many2one(
+        'mail.activity.type',
+        string='Tipo Attività',
+        default=lambda self: self._get_default_activity_type(),
+        help='Tipo dell\'attività creata sull\'ordine. Se vuoto viene usato "To Do".'
+    )
+
+    assignee_rule = fields.Selection(
+        selection=[
+            ('salesperson', 'Venditore dell\'ordine'),
+            ('team_leader', 'Responsabile del team di vendita'),
+            ('user', 'Utente specifico'),
+        ],
+        string='Assegna A',
+        required=True,
+        default='salesperson',
+        help='Regola per scegliere l\'utente a cui assegnare l\'attività. '
+             'Se la regola non trova un utente viene usato il venditore dell\'ordine.'
+    )
+
+    user_id = fields.Many2one(
+        'res.users',
+        string='Utente',
+        help='Utente assegnatario quando la regola è "Utente specifico".'
+    )
+
+    _sql_constraints = [
+        ('days_before_positive', 'CHECK(days_before > 0)',
+         'I giorni prima della scadenza devono essere maggiori di zero.'),
+        ('days_before_uniq', 'UNIQUE(days_before)',
+         'Esiste già una fase di alert con questo numero di giorni.'),
+    ]
+
+    @api.model
+    def _get_default_activity_type(self):
+        activity_type = self.env.ref('mail.mail_activity_data_todo', raise_if_not_found=False)
+        if not activity_type:
+            activity_type = self.env['mail.activity.type'].search([
+                ('name', 'ilike', 'To Do')
+            ], limit=1)
+        return activity_type
+
+    def _get_assignee(self, order):
+        """
+        Restituisce l'utente a cui assegnare l'alert di questa fase per l'ordine.
+        """
+        self.ensure_one()
+        if self.assignee_rule == 'team_leader' and order.team_id.user_id:
+            return order.team_id.user_id
+        if self.assignee_rule == 'user' and self.user_id:
+            return self.user_id
+        return order.user_id or self.env.user
@@ -0,0 +1,119 @@
+from odoo import api, fields, models
+from odoo.tools import SQL
+from odoo.tools.sql import create_index
+
+
+class SaleSubscriptionCalendarEvent(models.Model):
+    """
+    Calendario precalcolato degli eventi futuri degli abbonamenti
+    (fatturazioni, scadenze, alert), una riga per ordine ed evento.
+    Viene mantenuto in modo incrementale da SaleOrder.write/action_confirm e
+    portato avanti ogni giorno dal cron, così le previsioni leggono
+    direttamente questa tabella per intervallo di date.
+    """
+    _name = 'sale.subscription.calendar.event'
+    _description = 'Calendario Rinnovi Abbonamenti'
+    _order = 'date, order_id'
+    _rec_name = 'order_id'
+
+    order_id = fields.Many2one(
+        'sale.order',
+        string='Abbonamento',
+        required=True,
+        index=True,
+        ondelete='cascade',
+    )
+    event_type = fields.Selection(
+        selection=[
+            ('invoice', 'Fatturazione'),
+            ('expiry', 'Scadenza'),
+            ('alert', 'Alert Scadenza'),
+        ],
+        string='Evento',
+        required=True,
+    )
+    date = fields.Date(string='Data', required=True)
+    alert_stage_id = fields.Many2one(
+        'sale.subscription.alert.stage',
+        string='Fase Alert',
+        ondelete='cascade',
+    )
+    partner_id = fields.Many2one('res.partner', string='Cliente')
+    user_id = fields.Many2one('res.users', string='Venditore')
+    company_id = fields.Many2one('res.company', string='Azienda')
+    plan_id = fields.Many2one('sale.subscription.plan', string='Piano')
+    codice_noleggio = fields.Char(string='Codice Noleggio')
+
+    def init(self):
+        # Le letture del calendario sono sempre per intervallo di date,
+        # spesso filtrate per tipo di evento
+        create_index(
+            self.env.cr,
+            'sale_subscription_calendar_event_date_type_idx',
+            self._table,
+            ['date', 'event_type'],
+        )
+
+    @api.model
+    def _cron_sync_subscription_calendar(self):
+        """
+        Cron job che rigenera a blocchi il calendario degli abbonamenti in
+        corso o in pausa, per estendere l'orizzonte giorno per giorno e
+        riallineare gli alert dopo modifiche alle fasi.
+        All'inizio di ogni giro vengono rimossi gli eventi degli ordini non
+        più attivi (chiusi, disdetti, non più abbonamenti).
+        Il punto di ripresa è l'ultimo ordine elaborato (parametro di sistema
+        sale_subscription_customizations.calendar_sync_last_id), azzerato
+        dall'esecuzione che completa il giro.
+        """
+        params = self.env['ir.config_parameter'].sudo()
+        batch_size = int(params.get_param(
+            'sale_subscription_customizations.calendar_sync_batch_size', 1000
+        ))
+        last_id = int(params.get_param('sale_subscription_customizations.calendar_sync_last_id', 0))
+
+        if not last_id:
+            self._unlink_inactive_order_events()
+
+        active_domain = [
+            ('is_subscription', '=', True),
+            ('subscription_state', 'in', ('3_progress', '4_paused')),
+        ]
+        orders = self.env['sale.order'].search(
+            active_domain + [('id', '>', last_id)], order='id', limit=batch_size,
+        )
+        if not orders:
+            # Giro completato: il prossimo riparte dal primo ordine
+            params.set_param('sale_subscription_customizations.calendar_sync_last_id', 0)
+            self.env['ir.cron']._notify_progress(done=0, remaining=0)
+            return
+
+        orders._sync_subscription_calendar()
+        remaining = self.env['sale.order'].search_count(active_domain + [('id', '>', orders[-1].id)])
+        # A giro completato il punto di ripresa torna a zero già in questa
+        # esecuzione, così il giro del giorno dopo riparte dal primo ordine
+        # (e dalla pulizia degli ordini non più attivi)
+        params.set_param(
+            'sale_subscription_customizations.calendar_sync_last_id',
+            orders[-1].id if remaining else 0,
+        )
+        self.env['ir.cron']._notify_progress(done=len(orders), remaining=remaining)
+
+    @api.model
+    def _unlink_inactive_order_events(self):
+        """
+        Rimuove con una sola query gli eventi degli ordini non più in corso
+        o in pausa.
+        """
+        self.env['sale.order'].flush_model(['is_subscription', 'subscription_state'])
+        self.env.cr.execute(SQL(
+            """
+            DELETE FROM %(table)s event
+             USING sale_order so
+             WHERE so.id = event.order_id
+               AND NOT (COALESCE(so.is_subscription, FALSE)
+                        AND COALESCE(so.subscription_state, '') IN ('3_progress', '4_paused'))
+            """,
+            table=SQL.identifier(self._table),
+        ))
+        self.invalidate_model()
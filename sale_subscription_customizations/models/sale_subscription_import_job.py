@@ -0,0 +1,251 @@
+import csv
+import io
+import time
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+from odoo.tools import split_every
+
+IMPORT_COLUMNS = [
+    'partner', 'plan', 'product', 'quantity', 'price_unit', 'commitment_date',
+    'subscription_duration', 'subscription_duration_unit', 'codice_noleggio',
+]
+
+
+class SaleSubscriptionImportJob(models.Model):
+    """
+    Importazione massiva di abbonamenti da CSV, elaborata dal cron a blocchi.
+    Ogni blocco viene committato separatamente: i riferimenti (clienti, piani,
+    prodotti) sono risolti con una ricerca per modello, gli ordini creati con
+    una sola create con la logica sulle date sospesa, e le date derivate in
+    un unico passaggio raggruppato.
+    Il file viene separato in blocchi una sola volta all'avvio
+    (sale.subscription.import.job.chunk) e ogni blocco viene eliminato con
+    l'importazione delle sue righe: un timeout del cron non ripete i blocchi
+    già committati, un errore su una riga annulla solo il blocco che la
+    contiene e interrompe l'importazione.
+    """
+    _name = 'sale.subscription.import.job'
+    _description = 'Importazione Abbonamenti'
+    _order = 'id desc'
+    _rec_name = 'filename'
+
+    file = fields.Binary(string='File CSV', required=True, attachment=True)
+    filename = fields.Char(string='Nome File')
+    delimiter = fields.Char(string='Separatore', default=',', required=True)
+    chunk_size = fields.Integer(string='Righe per Blocco', default=500, required=True)
+    state = fields.Selection(
+        selection=[
+            ('pending', 'In Attesa'),
+            ('running', 'In Corso'),
+            ('done', 'Completato'),
+            ('failed', 'Errore'),
+        ],
+        string='Stato',
+        default='pending',
+        required=True,
+    )
+    chunk_ids = fields.One2many(
+        'sale.subscription.import.job.chunk',
+        'job_id',
+        string='Blocchi da Importare',
+    )
+    processed_count = fields.Integer(string='Righe Elaborate', readonly=True)
+    imported_count = fields.Integer(string='Abbonamenti Importati', readonly=True)
+    duration = fields.Float(string='Durata (s)', readonly=True)
+    rows_per_second = fields.Float(string='Righe al Secondo', readonly=True)
+    error = fields.Text(string='Errore', readonly=True)
+
+    @api.model
+    def _check_columns(self, fieldnames):
+        missing_columns = set(IMPORT_COLUMNS) - set(fieldnames or [])
+        if missing_columns:
+            raise UserError(_(
+                "Colonne mancanti nel file: %s", ", ".join(sorted(missing_columns))
+            ))
+
+    @api.model
+    def _prepare_chunk_vals(self, text, delimiter, chunk_size):
+        """
+        Separa il contenuto del file in blocchi di chunk_size righe, ognuno
+        un CSV autonomo con la propria intestazione.
+
+        :return: lista di valori per sale.subscription.import.job.chunk
+        """
+        reader = csv.reader(io.StringIO(text), delimiter=delimiter)
+        chunk_vals_list = []
+        try:
+            header = next(reader, [])
+            self._check_columns(header)
+            # Riga 1 = intestazione
+            first_row_number = 2
+            for rows in split_every(chunk_size, (row for row in reader if row), list):
+                output = io.StringIO()
+                writer = csv.writer(output, delimiter=delimiter)
+                writer.writerow(header)
+                writer.writerows(rows)
+                chunk_vals_list.append({
+                    'first_row_number': first_row_number,
+                    'row_count': len(rows),
+                    'data': output.getvalue(),
+                })
+                first_row_number += len(rows)
+        except csv.Error as e:
+            raise UserError(_("File CSV non valido: %s", e))
+        return chunk_vals_list
+
+    @api.model
+    def _parse_commitment_date(self, value, row_number):
+        if not value:
+            return False
+        try:
+            if len(value) <= 10:
+                return fields.Datetime.to_datetime(fields.Date.to_date(value))
+            return fields.Datetime.to_datetime(value)
+        except ValueError:
+            raise UserError(_("Riga %(row)s: data consegna non valida '%(value)s'.", row=row_number, value=value))
+
+    @api.model
+    def _parse_number(self, value, number_type, default, label, row_number):
+        if not value:
+            return default
+        try:
+            return number_type(value)
+        except ValueError:
+            raise UserError(_(
+                "Riga %(row)s: %(label)s non valido '%(value)s'.", row=row_number, label=label, value=value
+            ))
+
+    @api.model
+    def _parse_duration_unit(self, value, row_number):
+        if not value:
+            return 'months'
+        units = dict(self.env['sale.order']._fields['subscription_duration_unit'].selection)
+        if value not in units:
+            raise UserError(_(
+                "Riga %(row)s: unità durata non valida '%(value)s' (valori ammessi: %(units)s).",
+                row=row_number, value=value, units=", ".join(units),
+            ))
+        return value
+
+    @api.model
+    def _resolve_references(self, rows):
+        """
+        Risolve con una ricerca per modello i clienti (riferimento o nome),
+        i piani (nome) e i prodotti (codice interno) del blocco.
+        """
+        partner_keys = {row['partner'] for row in rows}
+        partners = self.env['res.partner'].search([
+            '|', ('ref', 'in', list(partner_keys)), ('name', 'in', list(partner_keys)),
+        ])
+        partner_by_key = {partner.name: partner.id for partner in partners}
+        partner_by_key.update({partner.ref: partner.id for partner in partners if partner.ref})
+
+        plans = self.env['sale.subscription.plan'].search([
+            ('name', 'in', list({row['plan'] for row in rows})),
+        ])
+        plan_by_name = {plan.name: plan.id for plan in plans}
+
+        products = self.env['product.product'].search([
+            ('default_code', 'in', list({row['product'] for row in rows})),
+        ])
+        product_by_code = {product.default_code: product.id for product in products}
+        return partner_by_key, plan_by_name, product_by_code
+
+    @api.model
+    def _prepare_order_vals(self, rows, first_row_number):
+        partner_by_key, plan_by_name, product_by_code = self._resolve_references(rows)
+        vals_list = []
+        for row_number, row in enumerate(rows, start=first_row_number):
+            partner_id = partner_by_key.get(row['partner'])
+            plan_id = plan_by_name.get(row['plan'])
+            product_id = product_by_code.get(row['product'])
+            if not partner_id:
+                raise UserError(_("Riga %(row)s: cliente '%(value)s' non trovato.", row=row_number, value=row['partner']))
+            if not plan_id:
+                raise UserError(_("Riga %(row)s: piano '%(value)s' non trovato.", row=row_number, value=row['plan']))
+            if not product_id:
+                raise UserError(_("Riga %(row)s: prodotto '%(value)s' non trovato.", row=row_number, value=row['product']))
+            vals_list.append({
+                'partner_id': partner_id,
+                'plan_id': plan_id,
+                'commitment_date': self._parse_commitment_date(row['commitment_date'], row_number),
+                'subscription_duration': self._parse_number(
+                    row['subscription_duration'], int, 0, _("durata"), row_number
+                ),
+                'subscription_duration_unit': self._parse_duration_unit(
+                    row['subscription_duration_unit'], row_number
+                ),
+                'codice_noleggio': row['codice_noleggio'] or False,
+                'order_line': [fields.Command.create({
+                    'product_id': product_id,
+                    'product_uom_qty': self._parse_number(row['quantity'], float, 1.0, _("quantità"), row_number),
+                    'price_unit': self._parse_number(row['price_unit'], float, 0.0, _("prezzo unitario"), row_number),
+                })],
+            })
+        return vals_list
+
+    def _process_chunk(self):
+        """
+        Importa il blocco successivo di righe. Un errore annulla solo il
+        blocco corrente e segna l'importazione come fallita.
+
+        :return: numero di righe importate
+        """
+        self.ensure_one()
+        chunk = self.chunk_ids[:1]
+        if not chunk:
+            self.state = 'done'
+            return 0
+
+        SaleOrder = self.env['sale.order'].with_context(subscription_import_mode=True)
+        start_time = time.perf_counter()
+        try:
+            with self.env.cr.savepoint():
+                rows = list(csv.DictReader(io.StringIO(chunk.data), delimiter=self.delimiter))
+                vals_list = self._prepare_order_vals(rows, chunk.first_row_number)
+                orders = SaleOrder.create(vals_list)
+                orders._apply_subscription_import_dates()
+                self.env.flush_all()
+        except Exception as e:
+            # Qualunque errore (dati, vincoli, CSV, database) annulla solo il
+            # blocco corrente: l'importazione resta ferma con il messaggio
+            self.write({
+                'state': 'failed',
+                'error': _(
+                    "%(error)s\nLe righe precedenti (%(count)s) sono state importate.",
+                    error=str(e), count=self.processed_count,
+                ),
+            })
+            return 0
+
+        duration = self.duration + time.perf_counter() - start_time
+        imported_count = self.imported_count + len(orders)
+        chunk.unlink()
+        self.write({
+            'state': 'running',
+            'processed_count': self.processed_count + len(rows),
+            'imported_count': imported_count,
+            'duration': duration,
+            'rows_per_second': imported_count / duration if duration else 0.0,
+        })
+        return len(rows)
+
+    @api.model
+    def _cron_process_import_jobs(self):
+        """
+        Cron che elabora un blocco della prima importazione in attesa o in
+        corso. Ogni chiamata viene committata dal cron, che si rilancia
+        finché restano importazioni da completare.
+        """
+        job = self.search([('state', 'in', ('pending', 'running'))], order='id', limit=1)
+        if not job:
+            self.env['ir.cron']._notify_progress(done=0, remaining=0)
+            return
+        done = job._process_chunk()
+        # Libera la cache tra un blocco e l'altro
+        self.env.invalidate_all()
+        self.env['ir.cron']._notify_progress(
+            done=done,
+            remaining=self.search_count([('state', 'in', ('pending', 'running'))]),
+        )
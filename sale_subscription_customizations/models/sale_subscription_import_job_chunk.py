@@ -0,0 +1,24 @@
+from odoo import fields, models
+
+
+class SaleSubscriptionImportJobChunk(models.Model):
+    """
+    Blocco di righe di un'importazione abbonamenti, separato una sola volta
+    all'avvio: un piccolo CSV autonomo (intestazione compresa) che il cron
+    legge senza rileggere il file intero. Il blocco viene eliminato nella
+    stessa transazione che ne importa le righe.
+    """
+    _name = 'sale.subscription.import.job.chunk'
+    _description = 'Blocco Importazione Abbonamenti'
+    _order = 'job_id, first_row_number'
+
+    job_id = fields.Many2one(
+        'sale.subscription.import.job',
+        string='Importazione',
+        required=True,
+        index=True,
+        ondelete='cascade',
+    )
+    first_row_number = fields.Integer(string='Prima Riga', required=True)
+    row_count = fields.Integer(string='Righe')
+    data = fields.Text(string='Contenuto CSV', required=True)
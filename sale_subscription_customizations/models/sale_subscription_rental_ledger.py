@@ -0,0 +1,255 @@
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.tools import SQL
+from odoo.tools.sql import create_index
+
+
+class SaleSubscriptionRentalLedger(models.Model):
+    """
+    Riepilogo di fatturazione per Codice Noleggio.
+    La tabella è precalcolata (non è una vista calcolata a ogni lettura) e viene
+    aggiornata dal cron: il primo aggiornamento è completo, i successivi
+    ricalcolano solo i codici noleggio toccati dall'ultimo aggiornamento e
+    quelli rimossi da righe o ordini (tabella dei codici da ricalcolare).
+    Periodicamente la tabella viene comunque ricostruita per intero.
+    """
+    _name = 'sale.subscription.rental.ledger'
+    _description = 'Riepilogo Fatturazione Noleggi'
+    _auto = False
+    _rec_name = 'codice_noleggio'
+    _order = 'codice_noleggio'
+
+    codice_noleggio = fields.Char(string='Codice Noleggio', readonly=True)
+    company_id = fields.Many2one('res.company', string='Azienda', readonly=True)
+    currency_id = fields.Many2one('res.currency', string='Valuta', readonly=True)
+    order_id = fields.Many2one('sale.order', string='Abbonamento', readonly=True)
+    partner_id = fields.Many2one('res.partner', string='Cliente', readonly=True)
+    invoice_count = fields.Integer(string='N. Fatture', readonly=True)
+    amount_untaxed = fields.Monetary(string='Imponibile Fatturato', readonly=True)
+    amount_total = fields.Monetary(string='Totale Fatturato', readonly=True)
+    amount_paid = fields.Monetary(string='Pagato', readonly=True)
+    amount_residual = fields.Monetary(string='Da Incassare', readonly=True)
+    last_invoice_date = fields.Date(string='Ultima Fattura', readonly=True)
+    next_invoice_date = fields.Date(string='Prossima Fattura', readonly=True)
+
+    _LAST_REFRESH_PARAM = 'sale_subscription_customizations.rental_ledger_last_refresh'
+    _LAST_FULL_REFRESH_PARAM = 'sale_subscription_customizations.rental_ledger_last_full_refresh'
+    _DIRTY_TABLE = 'sale_subscription_rental_ledger_dirty'
+
+    def init(self):
+        self.env.cr.execute(SQL("""
+            CREATE TABLE IF NOT EXISTS %(table)s (
+                id SERIAL PRIMARY KEY,
+                codice_noleggio VARCHAR NOT NULL,
+                company_id INTEGER NOT NULL,
+                currency_id INTEGER,
+                order_id INTEGER,
+                partner_id INTEGER,
+                invoice_count INTEGER,
+                amount_untaxed NUMERIC,
+                amount_total NUMERIC,
+                amount_paid NUMERIC,
+                amount_residual NUMERIC,
+                last_invoice_date DATE,
+                next_invoice_date DATE,
+                UNIQUE (company_id, codice_noleggio)
+            )
+        """, table=SQL.identifier(self._table)))
+        # Codici noleggio da ricalcolare perché tolti da una riga fattura o
+        # da un ordine: non sono più ritrovabili tramite write_date
+        self.env.cr.execute(SQL("""
+            CREATE TABLE IF NOT EXISTS %(table)s (
+                codice_noleggio VARCHAR PRIMARY KEY
+            )
+        """, table=SQL.identifier(self._DIRTY_TABLE)))
+        # Indici parziali per trovare righe fattura, fatture cliente e ordini
+        # modificati dall'ultimo aggiornamento (vedi _get_touched_codes)
+        create_index(
+            self.env.cr,
+            'account_move_line_codice_noleggio_write_date_idx',
+            'account_move_line',
+            ['write_date'],
+            where='codice_noleggio IS NOT NULL',
+        )
+        create_index(
+            self.env.cr,
+            'account_move_out_invoice_write_date_idx',
+            'account_move',
+            ['write_date'],
+            where="move_type IN ('out_invoice', 'out_refund')",
+        )
+        create_index(
+            self.env.cr,
+            'sale_order_codice_noleggio_write_date_idx',
+            'sale_order',
+            ['write_date'],
+            where='codice_noleggio IS NOT NULL',
+        )
+
+    @api.model
+    def _mark_codes_dirty(self, codes):
+        """
+        Segna i codici noleggio indicati come da ricalcolare al prossimo
+        aggiornamento. Chiamato da AccountMoveLine.write e SaleOrder.write
+        con i codici precedenti quando codice_noleggio cambia.
+        """
+        codes = [code for code in codes if code]
+        if not codes:
+            return
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO %(table)s (codice_noleggio)
+            SELECT DISTINCT unnest(%(codes)s::varchar[])
+            ON CONFLICT DO NOTHING
+            """,
+            table=SQL.identifier(self._DIRTY_TABLE),
+            codes=codes,
+        ))
+
+    @api.model
+    def _pop_dirty_codes(self):
+        """ Restituisce e svuota i codici noleggio segnati da ricalcolare. """
+        self.env.cr.execute(SQL(
+            "DELETE FROM %s RETURNING codice_noleggio",
+            SQL.identifier(self._DIRTY_TABLE),
+        ))
+        return [code for code, in self.env.cr.fetchall()]
+
+    @api.model
+    def _get_touched_codes(self, since):
+        """
+        Restituisce i codici noleggio con righe fattura, fatture cliente o
+        ordini modificati dopo la data indicata. Ogni ramo della query usa
+        un indice parziale su write_date (vedi init).
+        """
+        self.env.cr.execute("""
+            SELECT aml.codice_noleggio
+              FROM account_move_line aml
+             WHERE aml.codice_noleggio IS NOT NULL
+               AND aml.write_date > %(since)s
+             UNION
+            SELECT aml.codice_noleggio
+              FROM account_move am
+              JOIN account_move_line aml ON aml.move_id = am.id
+             WHERE am.write_date > %(since)s
+               AND am.move_type IN ('out_invoice', 'out_refund')
+               AND aml.codice_noleggio IS NOT NULL
+             UNION
+            SELECT so.codice_noleggio
+              FROM sale_order so
+             WHERE so.codice_noleggio IS NOT NULL
+               AND so.write_date > %(since)s
+        """, {'since': since})
+        return [code for code, in self.env.cr.fetchall()]
+
+    @api.model
+    def _refresh(self, codes=None):
+        """
+        Ricalcola il riepilogo. Se codes è None la tabella viene ricostruita
+        per intero, altrimenti solo le righe dei codici indicati.
+        Gli importi sono in valuta aziendale: totale e residuo di ogni fattura
+        sono ripartiti sulle righe in proporzione al loro imponibile.
+        """
+        if codes is not None and not codes:
+            return
+        self.env.flush_all()
+        if codes is None:
+            code_condition = SQL()
+            self.env.cr.execute(SQL("DELETE FROM %s", SQL.identifier(self._table)))
+        else:
+            code_condition = SQL("AND aml.codice_noleggio = ANY(%s)", list(codes))
+            self.env.cr.execute(SQL(
+                "DELETE FROM %s WHERE codice_noleggio = ANY(%s)",
+                SQL.identifier(self._table), list(codes),
+            ))
+
+        self.env.cr.execute(SQL("""
+            WITH ledger AS (
+                SELECT aml.codice_noleggio,
+                       aml.company_id,
+                       COUNT(DISTINCT am.id) AS invoice_count,
+                       SUM(-aml.balance) AS amount_untaxed,
+                       SUM(COALESCE(am.amount_total_signed * -aml.balance
+                                    / NULLIF(am.amount_untaxed_signed, 0), 0)) AS amount_total,
+                       SUM(COALESCE(am.amount_residual_signed * -aml.balance
+                                    / NULLIF(am.amount_untaxed_signed, 0), 0)) AS amount_residual,
+                       MAX(am.invoice_date) AS last_invoice_date
+                  FROM account_move_line aml
+                  JOIN account_move am ON am.id = aml.move_id
+                 WHERE aml.codice_noleggio IS NOT NULL
+                   AND aml.display_type = 'product'
+                   AND am.state = 'posted'
+                   AND am.move_type IN ('out_invoice', 'out_refund')
+                   %(code_condition)s
+              GROUP BY aml.codice_noleggio, aml.company_id
+            )
+            INSERT INTO %(table)s (
+                codice_noleggio, company_id, currency_id, order_id, partner_id,
+                invoice_count, amount_untaxed, amount_total, amount_paid, amount_residual,
+                last_invoice_date, next_invoice_date
+            )
+            SELECT ledger.codice_noleggio,
+                   ledger.company_id,
+                   company.currency_id,
+                   so.id,
+                   so.partner_id,
+                   ledger.invoice_count,
+                   ledger.amount_untaxed,
+                   ledger.amount_total,
+                   ledger.amount_total - ledger.amount_residual,
+                   ledger.amount_residual,
+                   ledger.last_invoice_date,
+                   so.next_invoice_date
+              FROM ledger
+              JOIN res_company company ON company.id = ledger.company_id
+         LEFT JOIN LATERAL (
+                    SELECT id, partner_id, next_invoice_date
+                      FROM sale_order
+                     WHERE codice_noleggio = ledger.codice_noleggio
+                       AND company_id = ledger.company_id
+                  ORDER BY subscription_state IN ('3_progress', '4_paused') DESC, id DESC
+                     LIMIT 1
+                   ) so ON TRUE
+        """, table=SQL.identifier(self._table), code_condition=code_condition))
+        self.invalidate_model()
+
+    @api.model
+    def _cron_refresh_rental_ledger(self):
+        """
+        Cron di aggiornamento del riepilogo: ricalcola i codici noleggio
+        toccati dall'ultimo aggiornamento e quelli segnati da ricalcolare.
+        La ricerca per write_date riparte da qualche minuto prima dell'ultimo
+        aggiornamento (parametro di sistema
+        sale_subscription_customizations.rental_ledger_overlap_minutes,
+        default 15), per includere le transazioni committate dopo l'inizio del
+        precedente aggiornamento ma con write_date anteriore.
+        La tabella viene ricostruita per intero alla prima esecuzione e poi
+        ogni sale_subscription_customizations.rental_ledger_full_refresh_days
+        giorni (default 7).
+        """
+        params = self.env['ir.config_parameter'].sudo()
+        overlap_minutes = int(params.get_param(
+            'sale_subscription_customizations.rental_ledger_overlap_minutes', 15
+        ))
+        full_refresh_days = int(params.get_param(
+            'sale_subscription_customizations.rental_ledger_full_refresh_days', 7
+        ))
+        # Data della transazione: le modifiche successive ricadranno nel
+        # prossimo aggiornamento
+        refresh_date = self.env.cr.now()
+        last_refresh = params.get_param(self._LAST_REFRESH_PARAM)
+        last_full_refresh = params.get_param(self._LAST_FULL_REFRESH_PARAM)
+
+        dirty_codes = self._pop_dirty_codes()
+        if (
+            not last_refresh
+            or not last_full_refresh
+            or fields.Datetime.from_string(last_full_refresh) <= refresh_date - timedelta(days=full_refresh_days)
+        ):
+            self._refresh()
+            params.set_param(self._LAST_FULL_REFRESH_PARAM, fields.Datetime.to_string(refresh_date))
+        else:
+            since = fields.Datetime.from_string(last_refresh) - timedelta(minutes=overlap_minutes)
+            self._refresh(set(self._get_touched_codes(since)) | set(dirty_codes))
+        params.set_param(self._LAST_REFRESH_PARAM, fields.Datetime.to_string(refresh_date))
@@ -0,0 +1,24 @@
+from odoo import api, models
+
+
+class ReportInvoiceWithoutPayment(models.AbstractModel):
+    _inherit = 'report.account.report_invoice'
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        """
+        Override per precalcolare, con una sola query per tutto il lotto di
+        fatture, quali fatture devono mostrare la colonna Codice Noleggio.
+        I codici delle righe vengono caricati in un'unica lettura, così il
+        template non percorre le righe di ogni fattura due volte.
+        """
+        res = super()._get_report_values(docids, data=data)
+        moves = res.get('docs') or self.env['account.move'].browse(docids)
+        groups = self.env['account.move.line']._read_group(
+            [('move_id', 'in', moves.ids), ('codice_noleggio', '!=', False)],
+            groupby=['move_id'],
+        )
+        res['codice_noleggio_move_ids'] = {move.id for move, in groups}
+        # Prefetch dei codici di tutte le righe del lotto
+        moves.invoice_line_ids.fetch(['codice_noleggio'])
+        return res
@@ -0,0 +1,5 @@
+from . import test_sale_order_dates
+from . import test_sale_order_expiration_alerts
+from . import test_sale_order_expiration_index
+from . import test_sale_order_write
+from . import test_sale_subscription_calendar
@@ -0,0 +1,30 @@
+from odoo import fields
+from odoo.tests import TransactionCase
+
+
+class SaleSubscriptionCustomizationsCommon(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.partner = cls.env['res.partner'].create({'name': 'Cliente Test'})
+        cls.plan = cls.env['sale.subscription.plan'].create({
+            'name': 'Mensile Test',
+            'billing_period_value': 1,
+            'billing_period_unit': 'month',
+        })
+
+    @classmethod
+    def _create_subscriptions(cls, vals_list):
+        """
+        Crea abbonamenti in bozza. La data consegna impegnata coincide con
+        start_date, così le write successive non vengono bloccate dal
+        write override.
+        """
+        order_vals_list = []
+        for vals in vals_list:
+            order_vals = {'partner_id': cls.partner.id, 'plan_id': cls.plan.id}
+            if vals.get('start_date'):
+                order_vals['commitment_date'] = fields.Datetime.to_datetime(vals['start_date'])
+            order_vals_list.append({**order_vals, **vals})
+        return cls.env['sale.order'].create(order_vals_list)
@@ -0,0 +1,81 @@
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+
+from odoo.tests import tagged
+
+from .common import SaleSubscriptionCustomizationsCommon
+
+
+@tagged('post_install', '-at_install')
+class TestSaleOrderDates(SaleSubscriptionCustomizationsCommon):
+
+    # (data inizio, durata, unità, data fine attesa)
+    END_DATE_CASES = [
+        (date(2025, 1, 31), 1, 'months', date(2025, 2, 28)),
+        (date(2024, 1, 31), 1, 'months', date(2024, 2, 29)),
+        (date(2025, 3, 31), 1, 'months', date(2025, 4, 30)),
+        (date(2024, 8, 31), 6, 'months', date(2025, 2, 28)),
+        (date(2024, 2, 29), 1, 'years', date(2025, 2, 28)),
+        (date(2024, 2, 29), 12, 'months', date(2025, 2, 28)),
+        (date(2024, 2, 29), 4, 'years', date(2028, 2, 29)),
+        (date(2025, 1, 15), 2, 'years', date(2027, 1, 15)),
+        (date(2025, 1, 15), 1, 'months', date(2025, 2, 15)),
+    ]
+
+    def _create_orders_without_end_date(self):
+        """
+        Ordini con data inizio e durata ma senza data fine: i valori sono
+        scritti con la logica sulle date sospesa (subscription_import_mode).
+        """
+        orders = self._create_subscriptions([
+            {'start_date': start_date} for start_date, _duration, _unit, _expected in self.END_DATE_CASES
+        ])
+        for order, (start_date, duration, unit, _expected) in zip(orders, self.END_DATE_CASES):
+            order.with_context(subscription_import_mode=True).write({
+                'start_date': start_date,
+                'subscription_duration': duration,
+                'subscription_duration_unit': unit,
+                'end_date': False,
+            })
+        return orders
+
+    def test_grouped_end_date_matches_per_record(self):
+        """ Il calcolo raggruppato dà le stesse date del calcolo per ordine. """
+        orders = self._create_orders_without_end_date()
+        orders.with_context(subscription_import_mode=True)._compute_end_date_from_duration()
+        grouped_end_dates = orders.mapped('end_date')
+
+        orders.with_context(subscription_import_mode=True).write({'end_date': False})
+        for order in orders:
+            order.with_context(subscription_import_mode=True)._compute_end_date_from_duration()
+        per_record_end_dates = orders.mapped('end_date')
+
+        self.assertEqual(grouped_end_dates, per_record_end_dates)
+        for order, (start_date, duration, unit, expected) in zip(orders, self.END_DATE_CASES):
+            # Stessa semantica di clamping di fine mese del relativedelta
+            self.assertEqual(order.end_date, start_date + relativedelta(**{unit: duration}))
+            self.assertEqual(order.end_date, expected, f"{start_date} + {duration} {unit}")
+
+    def test_mass_duration_write_end_date(self):
+        """ La write massiva della durata ricalcola la data fine di ogni ordine. """
+        orders = self._create_orders_without_end_date()
+        orders.write({'subscription_duration': 1, 'subscription_duration_unit': 'months'})
+        for order, (start_date, _duration, _unit, _expected) in zip(orders, self.END_DATE_CASES):
+            self.assertEqual(order.end_date, start_date + relativedelta(months=1))
+        self.assertEqual(orders[0].end_date, date(2025, 2, 28))
+        self.assertEqual(orders[1].end_date, date(2024, 2, 29))
+
+        orders.write({'subscription_duration': 1, 'subscription_duration_unit': 'years'})
+        self.assertEqual(orders[4].end_date, date(2025, 2, 28))
+        self.assertEqual(orders[0].end_date, date(2026, 1, 31))
+
+    def test_zero_duration_keeps_end_date(self):
+        """ Con durata 0 la data fine non viene modificata. """
+        order = self._create_subscriptions([{'start_date': date(2025, 1, 31)}])
+        order.with_context(subscription_import_mode=True).write({
+            'subscription_duration': 0,
+            'end_date': date(2025, 6, 30),
+        })
+        order._compute_end_date_from_duration()
+        self.assertEqual(order.end_date, date(2025, 6, 30))
@@ -0,0 +1,108 @@
+from datetime import timedelta
+
+from odoo import fields
+from odoo.modules.migration import load_script
+from odoo.tests import tagged
+
+from .common import SaleSubscriptionCustomizationsCommon
+
+
+@tagged('post_install', '-at_install')
+class TestSaleOrderExpirationAlerts(SaleSubscriptionCustomizationsCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stage_90 = cls.env.ref('sale_subscription_customizations.alert_stage_90')
+        cls.stage_60 = cls.env.ref('sale_subscription_customizations.alert_stage_60')
+        cls.stage_30 = cls.env.ref('sale_subscription_customizations.alert_stage_30')
+        cls.stage_7 = cls.env.ref('sale_subscription_customizations.alert_stage_7')
+
+    def _create_running_subscriptions(self, cases):
+        """
+        Crea abbonamenti in corso che scadono tra i giorni indicati, con
+        l'ultima fase di alert già inviata indicata.
+
+        :param cases: lista di tuple (giorni alla scadenza, fase già inviata)
+        """
+        today = fields.Date.today()
+        orders = self._create_subscriptions([{'start_date': today - timedelta(days=30)} for _case in cases])
+        for order, (days, sent_stage) in zip(orders, cases):
+            order.with_context(subscription_import_mode=True).write({
+                'subscription_state': '3_progress',
+                'end_date': today + timedelta(days=days),
+                'expiration_alert_stage_id': sent_stage.id if sent_stage else False,
+            })
+        return orders
+
+    def _get_due_stages(self, orders):
+        return {
+            order_id: stage_id
+            for order_id, stage_id in self.env['sale.order']._get_expiration_alerts_due()
+            if order_id in orders.ids
+        }
+
+    def _get_activity_count(self, order):
+        return self.env['mail.activity'].search_count([
+            ('res_model', '=', 'sale.order'), ('res_id', '=', order.id),
+        ])
+
+    def test_stage_classification(self):
+        """
+        Ogni ordine riceve la fase attiva con meno giorni che copre la
+        scadenza, a meno che non abbia già ricevuto quella fase o una
+        successiva; i già inviati non ricevono di nuovo l'alert.
+        """
+        cases = [
+            # (giorni alla scadenza, fase già inviata, fase attesa)
+            (85, None, self.stage_90),
+            (85, self.stage_90, None),
+            (50, None, self.stage_60),
+            (50, self.stage_90, self.stage_60),
+            (50, self.stage_60, None),
+            (20, self.stage_90, self.stage_30),
+            (20, self.stage_30, None),
+            (5, None, self.stage_7),
+            (5, self.stage_30, self.stage_7),
+            (5, self.stage_7, None),
+            (100, None, None),
+        ]
+        orders = self._create_running_subscriptions([(days, sent) for days, sent, _expected in cases])
+        expected = {
+            order.id: expected_stage.id
+            for order, (_days, _sent, expected_stage) in zip(orders, cases)
+            if expected_stage
+        }
+        self.assertEqual(self._get_due_stages(orders), expected)
+
+        no_stage = self.env['sale.subscription.alert.stage']
+        self.env['sale.order']._cron_create_expiration_alerts()
+        for order, (_days, sent_stage, expected_stage) in zip(orders, cases):
+            self.assertEqual(order.expiration_alert_stage_id, expected_stage or sent_stage or no_stage)
+            self.assertEqual(self._get_activity_count(order), 1 if expected_stage else 0)
+
+        # Una seconda esecuzione non invia di nuovo gli alert
+        self.assertFalse(self._get_due_stages(orders))
+        self.env['sale.order']._cron_create_expiration_alerts()
+        for order, (_days, _sent, expected_stage) in zip(orders, cases):
+            self.assertEqual(self._get_activity_count(order), 1 if expected_stage else 0)
+
+    def test_migrated_alert_flag(self):
+        """
+        Gli ordini con il vecchio flag expiration_alert_sent vengono collegati
+        alla fase dei 30 giorni: non ricevono di nuovo gli alert a 30 giorni
+        o più, ma ricevono quello a 7 giorni.
+        """
+        orders = self._create_running_subscriptions([(50, None), (20, None), (5, None)])
+        self.env.flush_all()
+        self.env.cr.execute("ALTER TABLE sale_order ADD COLUMN expiration_alert_sent BOOLEAN")
+        self.env.cr.execute(
+            "UPDATE sale_order SET expiration_alert_sent = TRUE WHERE id = ANY(%s)", [orders.ids],
+        )
+
+        migration = load_script('sale_subscription_customizations/migrations/18.0.1.1.0/post-migrate.py', 'post-migrate')
+        migration.migrate(self.env.cr, '18.0.1.0.0')
+        orders.invalidate_recordset(['expiration_alert_stage_id'])
+
+        self.assertEqual(orders.mapped('expiration_alert_stage_id'), self.stage_30)
+        self.assertEqual(self._get_due_stages(orders), {orders[2].id: self.stage_7.id})
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests import tagged
+from odoo.tools import SQL
+
+from .common import SaleSubscriptionCustomizationsCommon
+
+
+@tagged('post_install', '-at_install')
+class TestSaleOrderExpirationIndex(SaleSubscriptionCustomizationsCommon):
+
+    def test_expiration_query_uses_partial_index(self):
+        """
+        La query del cron degli alert di scadenza usa l'indice parziale
+        sale_order_subscription_expiration_idx.
+        Su un database di test quasi vuoto il planner preferirebbe comunque
+        una scansione sequenziale: viene disabilitata per la sola transazione,
+        così il piano mostra se l'indice è utilizzabile per il predicato.
+        """
+        today = fields.Date.today()
+        SaleOrder = self.env['sale.order']
+        self.env.flush_all()
+        self.env.cr.execute("SET LOCAL enable_seqscan = off")
+        self.env.cr.execute(SQL(
+            "EXPLAIN %s", SaleOrder._get_expiration_alerts_due_query(today, today + timedelta(days=90)),
+        ))
+        plan = "\n".join(line for line, in self.env.cr.fetchall())
+        self.assertIn('sale_order_subscription_expiration_idx', plan)
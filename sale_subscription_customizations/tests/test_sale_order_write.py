@@ -0,0 +1,54 @@
+from datetime import date, datetime
+
+from odoo.tests import tagged
+
+from .common import SaleSubscriptionCustomizationsCommon
+
+
+@tagged('post_install', '-at_install')
+class TestSaleOrderWrite(SaleSubscriptionCustomizationsCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Abbonamento con data consegna impegnata: le date sono modificabili
+        cls.order_committed = cls._create_subscriptions([{'start_date': date(2025, 1, 1)}])
+        # Abbonamenti senza data consegna impegnata, con e senza data inizio
+        cls.order_with_start, cls.order_without_dates = cls.env['sale.order'].create([
+            {'partner_id': cls.partner.id, 'plan_id': cls.plan.id, 'start_date': date(2025, 2, 1)},
+            {'partner_id': cls.partner.id, 'plan_id': cls.plan.id},
+        ])
+        cls.orders = cls.order_committed | cls.order_with_start | cls.order_without_dates
+
+    def test_mixed_batch_date_write(self):
+        """ In una write su ordini eterogenei ogni ordine riceve i propri vals. """
+        self.orders.write({
+            'start_date': date(2025, 3, 1),
+            'next_invoice_date': date(2025, 4, 1),
+            'end_date': date(2025, 12, 31),
+        })
+
+        # Data consegna impegnata: tutte le date scritte
+        self.assertEqual(self.order_committed.start_date, date(2025, 3, 1))
+        self.assertEqual(self.order_committed.next_invoice_date, date(2025, 4, 1))
+        self.assertEqual(self.order_committed.end_date, date(2025, 12, 31))
+        # Senza data consegna ma con data inizio: la data inizio non cambia
+        self.assertEqual(self.order_with_start.start_date, date(2025, 2, 1))
+        self.assertEqual(self.order_with_start.next_invoice_date, date(2025, 4, 1))
+        self.assertEqual(self.order_with_start.end_date, date(2025, 12, 31))
+        # Senza data consegna né data inizio: nessuna data impostata
+        self.assertFalse(self.order_without_dates.start_date)
+        self.assertFalse(self.order_without_dates.next_invoice_date)
+        self.assertFalse(self.order_without_dates.end_date)
+
+    def test_mixed_batch_commitment_date_write(self):
+        """
+        La prima data consegna impegnata valorizza data inizio e prossima
+        fattura; sugli ordini che l'avevano già le date restano invariate.
+        """
+        self.orders.write({'commitment_date': datetime(2025, 5, 10, 9, 0)})
+
+        self.assertEqual(self.order_committed.start_date, date(2025, 1, 1))
+        for order in self.order_with_start | self.order_without_dates:
+            self.assertEqual(order.start_date, date(2025, 5, 10))
+            self.assertEqual(order.next_invoice_date, date(2025, 5, 10))
@@ -0,0 +1,67 @@
+from datetime import date
+
+from freezegun import freeze_time
+
+from odoo.tests import tagged
+
+from .common import SaleSubscriptionCustomizationsCommon
+
+LAST_ID_PARAM = 'sale_subscription_customizations.calendar_sync_last_id'
+
+
+@tagged('post_install', '-at_install')
+class TestSaleSubscriptionCalendar(SaleSubscriptionCustomizationsCommon):
+
+    def _run_calendar_cron(self):
+        """Esegue il cron finché il giro non è completato, come farebbe lo scheduler."""
+        Event = self.env['sale.subscription.calendar.event']
+        params = self.env['ir.config_parameter'].sudo()
+        runs = 0
+        while True:
+            Event._cron_sync_subscription_calendar()
+            runs += 1
+            if not int(params.get_param(LAST_ID_PARAM, 0)):
+                return runs
+            self.assertLess(runs, 10, "Il giro del calendario non si completa")
+
+    def _get_events(self, order):
+        return self.env['sale.subscription.calendar.event'].search([('order_id', '=', order.id)])
+
+    def test_cron_daily_cycles(self):
+        """
+        Ogni giorno il cron riparte dal primo ordine: il punto di ripresa
+        viene azzerato dall'esecuzione che completa il giro, gli eventi
+        passati escono dal calendario e gli ordini chiusi perdono i loro
+        eventi già al giro successivo.
+        """
+        params = self.env['ir.config_parameter'].sudo()
+        params.set_param('sale_subscription_customizations.calendar_sync_batch_size', 1)
+        day_1 = date(2026, 3, 2)
+        day_2 = date(2026, 3, 3)
+
+        with freeze_time(day_1):
+            orders = self._create_subscriptions([{'start_date': day_1} for _i in range(2)])
+            orders.with_context(subscription_import_mode=True).write({
+                'subscription_state': '3_progress',
+                'next_invoice_date': day_1,
+            })
+            order_kept, order_closed = orders
+            params.set_param(LAST_ID_PARAM, 0)
+
+            # Un ordine per esecuzione: l'ultima completa il giro e azzera
+            # il punto di ripresa senza un'esecuzione a vuoto
+            self.assertEqual(self._run_calendar_cron(), 2)
+            self.assertIn(day_1, self._get_events(order_kept).mapped('date'))
+            self.assertTrue(self._get_events(order_closed))
+
+        with freeze_time(day_2):
+            # Chiusura senza aggiornamento incrementale del calendario: deve
+            # pensarci la pulizia a inizio giro
+            order_closed.with_context(skip_subscription_calendar_sync=True).write({
+                'subscription_state': '6_churn',
+            })
+            self.assertEqual(self._run_calendar_cron(), 1)
+            self.assertFalse(self._get_events(order_closed))
+            kept_dates = self._get_events(order_kept).mapped('date')
+            self.assertTrue(kept_dates)
+            self.assertTrue(all(event_date >= day_2 for event_date in kept_dates))
@@ -0,0 +1 @@
+from . import sale_subscription_import
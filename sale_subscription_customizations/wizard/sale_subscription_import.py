@@ -0,0 +1,48 @@
+import base64
+
+from odoo import fields, models, _
+from odoo.exceptions import UserError
+
+
+class SaleSubscriptionImport(models.TransientModel):
+    """
+    Avvio dell'importazione massiva di abbonamenti da CSV: verifica la
+    codifica e le colonne del file, lo separa in blocchi e crea
+    l'importazione, elaborata a blocchi dal cron
+    (vedi sale.subscription.import.job).
+    """
+    _name = 'sale.subscription.import'
+    _description = 'Avvio Importazione Abbonamenti'
+
+    file = fields.Binary(string='File CSV', required=True)
+    filename = fields.Char(string='Nome File')
+    delimiter = fields.Char(string='Separatore', default=',', required=True)
+    chunk_size = fields.Integer(string='Righe per Blocco', default=500, required=True)
+
+    def action_import(self):
+        self.ensure_one()
+        if self.chunk_size <= 0:
+            raise UserError(_("Il numero di righe per blocco deve essere maggiore di zero."))
+
+        try:
+            text = base64.b64decode(self.file).decode('utf-8-sig')
+        except UnicodeDecodeError as e:
+            raise UserError(_("Il file deve essere codificato in UTF-8: %s", e))
+        Job = self.env['sale.subscription.import.job']
+        chunk_vals_list = Job._prepare_chunk_vals(text, self.delimiter, self.chunk_size)
+
+        job = Job.create({
+            'file': self.file,
+            'filename': self.filename,
+            'delimiter': self.delimiter,
+            'chunk_size': self.chunk_size,
+            'chunk_ids': [fields.Command.create(vals) for vals in chunk_vals_list],
+        })
+        self.env.ref('sale_subscription_customizations.ir_cron_subscription_import')._trigger()
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': job._name,
+            'res_id': job.id,
+            'view_mode': 'form',
+            'target': 'current',
+        }